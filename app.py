@@ -2,17 +2,38 @@ import logging
 import json
 import os
 import datetime
-import csv
-import io
-from functools import wraps
-import re
+import bisect
+import hashlib
+import itertools
+import atexit
+import glob
+import gzip
+import logging.handlers
+import zlib
+import mimetypes
+import queue
+import shutil
+import time
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps, lru_cache
 from flask import send_file, Flask, request, render_template, redirect, url_for, session, flash, Response
 # ... in main.py, at the top ...
 from flask import send_file, Flask, request, render_template, redirect, url_for, session, flash, Response, abort, \
-    send_from_directory
+    jsonify, stream_with_context, get_template_attribute
 # ...
 # --- START: Re-added itsdangerous for secure links ---
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadTimeSignature
+from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadTimeSignature, BadSignature
+import click
+from werkzeug.security import safe_join
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines have no flock; see store_transaction().
+    fcntl = None
 
 # --- END: Re-added ---
 
@@ -30,84 +51,1743 @@ COMPONENTS_DB = 'components.json'
 REQUESTS_DB = 'requests.json'
 USERS_DB = 'users.json'
 
-# --- Logging (Unchanged) ---
-logging.basicConfig(
-    filename='activity.log', level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-audit_handler = logging.FileHandler('audit.log')
-audit_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+# Changed request records are appended here and folded back into REQUESTS_DB
+# once the journal grows past REQUESTS_JOURNAL_COMPACT_BYTES.
+REQUESTS_JOURNAL = 'requests.journal.jsonl'
+REQUESTS_JOURNAL_COMPACT_BYTES = int(os.environ.get('RACELAB_JOURNAL_COMPACT_BYTES', 512 * 1024))
+
+# Advisory lock serialising writers across worker processes, and the commit
+# record used to apply a multi-file change as a unit (see JsonBackend.commit).
+STORE_LOCK_FILE = 'racelab.lock'
+COMMIT_RECORD = 'racelab.commit.json'
+
+# Persisted counters behind request and batch ids (JSON backend only).
+SEQUENCES_DB = 'sequences.json'
+# Counter bumped by every store commit; API ETags are derived from it.
+DATA_VERSION_SEQUENCE = 'data_version'
+# Precompressed copies of the files under static/, named by content hash.
+STATIC_BUILD_DIR = os.environ.get('RACELAB_STATIC_BUILD_DIR', 'static_build')
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+# Compiled templates, shared by every worker and kept across restarts. `flask
+# precompile` fills it at build time so a fresh instance never parses one.
+JINJA_CACHE_DIR = os.environ.get('RACELAB_JINJA_CACHE_DIR', 'jinja_cache')
+# Types worth compressing, for static files and responses alike; images such as
+# bannerlogo.jpg are compressed already.
+COMPRESSIBLE_TYPES = ('text/', 'image/svg+xml', 'image/vnd.microsoft.icon', 'image/x-icon',
+                      'application/javascript', 'application/json')
+# Responses smaller than this go out uncompressed; the framing would eat the saving.
+COMPRESS_MIN_SIZE = int(os.environ.get('RACELAB_COMPRESS_MIN_SIZE', 1024))
+# Counter bumped by every save_components; cached inventory fragments are keyed by it.
+INVENTORY_VERSION_SEQUENCE = 'inventory_version'
+# How many rendered inventory fragments each worker keeps.
+FRAGMENT_CACHE_SIZE = int(os.environ.get('RACELAB_FRAGMENT_CACHE_SIZE', 16))
+
+# What each commit changed is appended here as one JSON line and tailed by
+# every worker, so live streams see saves made in other processes. The file
+# is started afresh once it passes EVENTS_LOG_MAX_BYTES.
+EVENTS_LOG = 'racelab.events.jsonl'
+EVENTS_LOG_MAX_BYTES = 1024 * 1024
+EVENTS_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+
+REQUEST_STATUSES = ['Pending Mentor', 'Pending Incharge', 'Approved', 'ISSUED', 'Returned',
+                    'Rejected', 'Cancelled', 'Purchased']
+PROJECT_TYPES = ['Intra-Day', 'Project Work', 'Competition', 'Faculty Project', 'Faculty Purchase']
+# Borrow requests in these states hold reserved stock (see ComponentCatalog.reserve).
+RESERVING_STATUSES = ('Pending Mentor', 'Pending Incharge', 'Approved')
+# Mentor approval links lapse after this many seconds; the batch is then rejected and its stock released.
+MENTOR_LINK_MAX_AGE = 72 * 60 * 60
+
+# CSV exports are flushed to the client every this many rows.
+EXPORT_CHUNK_ROWS = 500
+
+# Rows per page in the HOD and admin request history tables.
+REQUEST_PAGE_SIZE = 50
+
+# The queues 'Pending Incharge' requests are split into on admin_dashboard.
+INCHARGE_QUEUE_BUCKETS = ('purchase', 'faculty', 'intra_day', 'project')
+
+# Requests in these states never change again. `flask archive-requests` moves
+# the ones submitted more than ARCHIVE_AFTER_DAYS ago into ARCHIVE_DIR.
+CLOSED_STATUSES = ('Returned', 'Cancelled', 'Rejected', 'Purchased')
+ARCHIVE_DIR = os.environ.get('RACELAB_ARCHIVE_DIR', 'archive')
+ARCHIVE_MANIFEST = os.path.join(ARCHIVE_DIR, 'manifest.json')
+ARCHIVE_AFTER_DAYS = int(os.environ.get('RACELAB_ARCHIVE_AFTER_DAYS', 60))
+
+# Both logs roll over once they pass their size limit or at the first write
+# of a new LOG_ROTATE_SECONDS period. activity.log keeps ACTIVITY_LOG_BACKUPS
+# gzipped backups; audit.log is sealed into gzipped, timestamped segments that
+# are never deleted (see sealed_audit_segments).
+ACTIVITY_LOG = 'activity.log'
+ACTIVITY_LOG_MAX_BYTES = int(os.environ.get('RACELAB_ACTIVITY_LOG_MAX_BYTES', 5 * 1024 * 1024))
+ACTIVITY_LOG_BACKUPS = int(os.environ.get('RACELAB_ACTIVITY_LOG_BACKUPS', 10))
+AUDIT_LOG_MAX_BYTES = int(os.environ.get('RACELAB_AUDIT_LOG_MAX_BYTES', 5 * 1024 * 1024))
+LOG_ROTATE_SECONDS = int(os.environ.get('RACELAB_LOG_ROTATE_SECONDS', 24 * 60 * 60))
+LOG_ROTATE_LOCK_FILE = 'racelab.log.lock'
+
+# AUDIT_LOG holds one JSON object per line (see audit_event). Export rows are
+# cached as CSV; the state file records which sealed segments and how far into
+# AUDIT_LOG the cache reaches, so each export only decodes new lines. The
+# export lock also covers audit.log rotation.
+AUDIT_LOG = 'audit.log'
+AUDIT_EXPORT_CACHE = 'audit.export.csv'
+AUDIT_EXPORT_STATE = 'audit.export.json'
+AUDIT_EXPORT_LOCK_FILE = 'audit.export.lock'
+
+# Every AUDIT_INDEX_STRIDE-th event's timestamp and byte offset are kept in
+# AUDIT_INDEX, so time-range queries can seek instead of scanning from byte 0.
+AUDIT_INDEX = 'audit.index.json'
+AUDIT_INDEX_STRIDE = 256
+AUDIT_QUERY_LIMIT = 1000
+
+# 'json' keeps the three flat files above; 'sqlite' moves everything into SQLITE_DB;
+# 'events' keeps requests and components as the domain event log below.
+STORAGE_BACKEND = os.environ.get('RACELAB_STORAGE', 'json').lower()
+SQLITE_DB = os.environ.get('RACELAB_SQLITE_DB', 'racelab.db')
+
+# Event-sourced store: one JSON line per commit, holding that commit's domain
+# events. Every SNAPSHOT_EVERY_COMMITS commits the whole state is written to
+# SNAPSHOT_DIR with the log offset it covers, so a cold start parses one
+# snapshot and replays only the lines after it.
+EVENT_STORE = 'racelab.domain.jsonl'
+SNAPSHOT_DIR = os.environ.get('RACELAB_SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_INDEX = os.path.join(SNAPSHOT_DIR, 'index.json')
+SNAPSHOT_EVERY_COMMITS = int(os.environ.get('RACELAB_SNAPSHOT_EVERY', 500))
+
+# --- Logging ---
+# Request threads only put records on a queue; a QueueListener thread per log
+# file formats them and does the disk writes. The listeners start with the
+# first request, so importing the app (the CLI, a cold start) spawns no threads.
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rolls over by size or at the first write of a new `interval`, gzipping
+    what it rotates out. Safe to share between worker processes: writes hold
+    a shared lock on `lock_file` and rotation an exclusive one, and a worker
+    whose file was rotated by another process reopens the new one.
+    """
+    lock_file = LOG_ROTATE_LOCK_FILE
+
+    def __init__(self, filename, max_bytes, backup_count, interval):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.namer = lambda name: name + '.gz'
+        self.rotator = _gzip_rotator
+
+    def shouldRollover(self, record):
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return False
+        if stat.st_size == 0:
+            return False
+        if 0 < self.maxBytes <= stat.st_size:
+            return True
+        return bool(self.interval) and int(time.time() // self.interval) != int(stat.st_mtime // self.interval)
+
+    def _close_stream(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                with _exclusive_lock(self.lock_file):
+                    # Another worker may have rotated the file while we waited.
+                    if self.shouldRollover(record):
+                        self._close_stream()
+                        self.rotate_files()
+            with _shared_lock(self.lock_file):
+                if self.stream and (not os.path.exists(self.baseFilename) or
+                                    os.fstat(self.stream.fileno()).st_ino != os.stat(self.baseFilename).st_ino):
+                    self._close_stream()
+                logging.FileHandler.emit(self, record)
+        except Exception:
+            self.handleError(record)
+
+    def rotate_files(self):
+        self.doRollover()
+
+
+class AuditLogHandler(RotatingLogHandler):
+    """Seals audit.log into audit.log.<timestamp>.gz segments instead of numbered backups."""
+    lock_file = AUDIT_EXPORT_LOCK_FILE
+
+    def __init__(self, filename, max_bytes, interval):
+        super().__init__(filename, max_bytes, 0, interval)
+
+    def rotate_files(self):
+        stamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self.rotate(self.baseFilename, self.rotation_filename(f"{self.baseFilename}.{stamp}"))
+
+
+_log_listeners = []
+_log_listeners_lock = threading.Lock()
+_log_listeners_started = False
+
+
+def _add_log_listener(logger, handler):
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listeners.append(logging.handlers.QueueListener(log_queue, handler))
+
+
+def start_log_listeners():
+    global _log_listeners_started
+    with _log_listeners_lock:
+        if _log_listeners_started:
+            return
+        for listener in _log_listeners:
+            listener.start()
+        _log_listeners_started = True
+
+
+@atexit.register
+def _stop_log_listeners():
+    """Writes out what is still queued at exit, including the records of a run that served no requests."""
+    start_log_listeners()
+    for listener in _log_listeners:
+        listener.stop()
+
+
+class AuditEventFormatter(logging.Formatter):
+    """Renders each audit record as one JSON line with a sortable 'ts' first."""
+
+    def format(self, record):
+        event = getattr(record, 'audit_event', None) or {'action': 'UNKNOWN', 'remarks': record.getMessage()}
+        return json.dumps({'ts': self.formatTime(record), **event})
+
+
+activity_handler = RotatingLogHandler(ACTIVITY_LOG, ACTIVITY_LOG_MAX_BYTES, ACTIVITY_LOG_BACKUPS, LOG_ROTATE_SECONDS)
+activity_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+logging.getLogger().setLevel(logging.INFO)
+_add_log_listener(logging.getLogger(), activity_handler)
+
+audit_handler = AuditLogHandler(AUDIT_LOG, AUDIT_LOG_MAX_BYTES, LOG_ROTATE_SECONDS)
+audit_handler.setFormatter(AuditEventFormatter())
 audit_logger = logging.getLogger('audit_logger')
 audit_logger.setLevel(logging.INFO)
-audit_logger.addHandler(audit_handler)
+_add_log_listener(audit_logger, audit_handler)
 
 
-# --- JSON Helper Functions (CORRECTED) ---
+@app.before_request
+def _start_logging():
+    if not _log_listeners_started:
+        start_log_listeners()
 
-def load_components():
-    """Loads components.json safely."""
-    if not os.path.exists(COMPONENTS_DB) or os.path.getsize(COMPONENTS_DB) == 0:
+
+def audit_event(action, actor, request_id=None, component=None, before=None, after=None, remarks=None,
+                level=logging.INFO, items=None):
+    """
+    Records one audit event. `before` and `after` map changed fields (stock
+    quantities, request status) to their values either side of the action.
+    A grouped event lists its per-request changes in `items`, each a dict
+    with the same request_id/component/before/after/remarks keys.
+    """
+    event = {'action': action, 'actor': actor, 'request_id': request_id, 'component': component,
+             'before': before, 'after': after, 'remarks': remarks}
+    if items:
+        event['items'] = items
+    audit_logger.log(level, f"{action} by {actor}", extra={'audit_event': event})
+
+
+# --- Cached JSON Store ---
+# Parsed file contents are kept per path together with the (mtime, size, inode)
+# signature they were read at. A read only re-parses when the file on disk no
+# longer matches that signature; writes from this process refresh the entry
+# directly so the next read does not parse what we just wrote.
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+
+def _file_signature(stat_result):
+    return stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino
+
+
+def _copy_records(records):
+    """Records are flat dicts, so a per-record shallow copy is a full copy."""
+    return [dict(record) for record in records]
+
+
+def _read_json_cached(path):
+    """Returns the parsed list stored at path, re-parsing only if the file changed."""
+    try:
+        signature = _file_signature(os.stat(path))
+    except FileNotFoundError:
+        return []
+
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    if signature[1] == 0:
         return []
     try:
-        with open(COMPONENTS_DB, 'r') as f:
-            return json.load(f)
+        with open(path, 'r') as f:
+            # Key the entry on the inode we actually read, not the earlier stat.
+            signature = _file_signature(os.fstat(f.fileno()))
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
     except json.JSONDecodeError:
-        app.logger.error(f"Failed to decode {COMPONENTS_DB}. Returning empty list.")
+        app.logger.error(f"Failed to decode {path}. Returning empty list.")
         return []
 
+    with _json_cache_lock:
+        _json_cache[path] = (signature, data)
+    return data
+
+
+def _write_json_cached(path, data):
+    # Write a sibling temp file and rename it over the original, so readers
+    # only ever see the old or the new file, never a half-written one.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+        signature = _file_signature(os.fstat(f.fileno()))
+    os.replace(tmp_path, path)
+    with _json_cache_lock:
+        _json_cache[path] = (signature, _copy_records(data) if isinstance(data, list) else dict(data))
+
+
+# --- Storage Backends ---
+# Routes never touch a backend directly; they go through the helper functions
+# further down, which forward to whichever backend STORAGE_BACKEND selected.
+
+def request_sort_key(record):
+    return record.get('request_timestamp') or '', record['id']
+
+
+def request_matches(record, filters):
+    """
+    Whether a request passes the dashboard filters: status, exclude_statuses,
+    project_type, student_dept, date_from/date_to ('YYYY-MM-DD', inclusive)
+    and q (case-insensitive text in the id, batch, user or component).
+    """
+    if filters.get('status') and record.get('status') != filters['status']:
+        return False
+    if filters.get('exclude_statuses') and record.get('status') in filters['exclude_statuses']:
+        return False
+    if filters.get('project_type') and record.get('project_type') != filters['project_type']:
+        return False
+    if filters.get('student_dept') and record.get('student_dept') != filters['student_dept']:
+        return False
+    submitted_on = (record.get('request_timestamp') or '')[:10]
+    if filters.get('date_from') and submitted_on < filters['date_from']:
+        return False
+    if filters.get('date_to') and submitted_on > filters['date_to']:
+        return False
+    if filters.get('q'):
+        text = filters['q'].casefold()
+        fields = (record.get('batch_id'), record.get('student_name'), record.get('student_email'),
+                  record.get('component_name'))
+        return str(record['id']) == filters['q'].strip() or any(text in (f or '').casefold() for f in fields)
+    return True
+
+
+def incharge_queue_bucket(record):
+    """The admin_dashboard queue a request waiting on the incharge belongs in, or None."""
+    if record.get('status') != 'Pending Incharge':
+        return None
+    if record.get('request_type') == 'purchase':
+        return 'purchase'
+    # Check for Faculty (by dept or project type)
+    if record.get('student_dept') == 'Faculty' or 'Faculty' in record.get('project_type', ''):
+        return 'faculty'
+    if record.get('project_type') == 'Intra-Day':
+        return 'intra_day'
+    # Project Work, Competition, and any older borrow request.
+    return 'project'
+
+
+def _queue_batch_key(record):
+    # Use batch_id if available, otherwise group individual reqs
+    return record.get('batch_id', f"req-{record['id']}")
+
+
+def group_incharge_queue(records):
+    """Buckets records into {bucket: {batch_id: [record, ...]}} as incharge_queue_bucket() sorts them."""
+    queue_view = {bucket: {} for bucket in INCHARGE_QUEUE_BUCKETS}
+    for record in records:
+        bucket = incharge_queue_bucket(record)
+        if bucket:
+            queue_view[bucket].setdefault(_queue_batch_key(record), []).append(record)
+    return queue_view
+
+
+class RequestIndex:
+    """
+    In-memory lookup tables over the request history. put() keeps every table
+    current as records are created or changed, so a lookup costs as much as
+    what it returns rather than a scan of all requests ever made.
+    """
+
+    # Filter fields with their own table, most selective first.
+    INDEXED_FIELDS = ('batch_id', 'student_email', 'status')
+
+    def __init__(self, records=()):
+        self.by_id = {}  # id -> record, in insertion (= id) order
+        self.by_batch = {}  # batch_id -> [id, ...]
+        self.by_email = {}  # student_email -> [id, ...]
+        self.by_status = {}  # status -> {id, ...}
+        self.by_time = []  # sorted (request_timestamp, id) keys, for newest-first paging
+        # Materialised incharge queue: bucket -> batch_id -> sorted [id, ...]
+        self.incharge_queue = {bucket: {} for bucket in INCHARGE_QUEUE_BUCKETS}
+        for record in records:
+            self.put(record)
+
+    def _tables(self):
+        return (('batch_id', self.by_batch), ('student_email', self.by_email), ('status', self.by_status))
+
+    def put(self, record):
+        request_id = record['id']
+        previous = self.by_id.get(request_id)
+        for field, table in self._tables():
+            if previous is not None:
+                if previous.get(field) == record.get(field):
+                    continue
+                bucket = table.get(previous.get(field))
+                bucket.remove(request_id)
+                if not bucket:
+                    del table[previous.get(field)]
+            if field == 'status':
+                table.setdefault(record.get(field), set()).add(request_id)
+            else:
+                table.setdefault(record.get(field), []).append(request_id)
+        key = request_sort_key(record)
+        if previous is None or request_sort_key(previous) != key:
+            if previous is not None:
+                del self.by_time[bisect.bisect_left(self.by_time, request_sort_key(previous))]
+            bisect.insort(self.by_time, key)
+        self._update_incharge_queue(previous, record)
+        self.by_id[request_id] = record
+
+    def _update_incharge_queue(self, previous, record):
+        old = (incharge_queue_bucket(previous), _queue_batch_key(previous)) if previous is not None else (None, None)
+        new = (incharge_queue_bucket(record), _queue_batch_key(record))
+        if old == new:
+            return
+        if old[0]:
+            batch = self.incharge_queue[old[0]][old[1]]
+            batch.remove(record['id'])
+            if not batch:
+                del self.incharge_queue[old[0]][old[1]]
+        if new[0]:
+            bisect.insort(self.incharge_queue[new[0]].setdefault(new[1], []), record['id'])
+
+    def queue_view(self):
+        """The incharge queue as {bucket: {batch_id: [record, ...]}}, batches in order of their first id."""
+        return {bucket: {batch_id: [self.by_id[request_id] for request_id in ids]
+                         for batch_id, ids in sorted(batches.items(), key=lambda item: item[1][0])}
+                for bucket, batches in self.incharge_queue.items()}
+
+    def get(self, request_id):
+        return self.by_id.get(request_id)
+
+    def find(self, **filters):
+        """Records matching every filter, narrowed through the smallest applicable index first."""
+        if 'id' in filters:
+            record = self.by_id.get(filters['id'])
+            candidates = [record['id']] if record else []
+        else:
+            candidates = None
+            for field, table in self._tables():
+                if field in filters:
+                    ids = table.get(filters[field], ())
+                    if candidates is None or len(ids) < len(candidates):
+                        candidates = ids
+        if candidates is None:
+            records = self.by_id.values()
+        else:
+            records = (self.by_id[request_id] for request_id in sorted(candidates))
+        return [r for r in records if all(r.get(field) == value for field, value in filters.items())]
+
+    def page(self, before, limit, filters):
+        """
+        Up to `limit` records matching `filters`, newest first, starting after
+        the `before` key. Only keys inside the date range are walked, or only
+        the status's own records when that table is smaller.
+        """
+        keys, start, stop = self.by_time, len(self.by_time), 0
+        if filters.get('status'):
+            status_ids = self.by_status.get(filters['status'], ())
+            if len(status_ids) < len(keys):
+                keys = sorted(request_sort_key(self.by_id[request_id]) for request_id in status_ids)
+                start = len(keys)
+        if before:
+            start = bisect.bisect_left(keys, before)
+        if filters.get('date_to'):
+            start = min(start, bisect.bisect_left(keys, (filters['date_to'] + '\uffff',)))
+        if filters.get('date_from'):
+            stop = bisect.bisect_left(keys, (filters['date_from'],))
+        records = []
+        position = start
+        while position > stop and len(records) < limit:
+            position -= 1
+            record = self.by_id[keys[position][1]]
+            if request_matches(record, filters):
+                records.append(record)
+        return records
+
+    def max_id(self):
+        return max(self.by_id, default=0)
+
+    def records(self):
+        return list(self.by_id.values())
+
+
+class JsonBackend:
+    """
+    The original flat files. requests.json is a snapshot; every request that
+    is created or changed afterwards is appended to REQUESTS_JOURNAL as one
+    JSON line, so a status change costs one line of I/O instead of a rewrite
+    of the whole history. The journal is compacted back into the snapshot once
+    it passes REQUESTS_JOURNAL_COMPACT_BYTES.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshot_signature = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._index = RequestIndex()
+
+    # --- Request snapshot + journal ---
+
+    def _reset_from_snapshot(self, snapshot_signature):
+        # Records are only ever replaced in the index, never mutated, so the cached snapshot dicts can be shared.
+        self._index = RequestIndex(_read_json_cached(REQUESTS_DB))
+        self._snapshot_signature = snapshot_signature
+        self._journal_inode = None
+        self._journal_offset = 0
+
+    def _refresh_requests(self):
+        """
+        Brings the request index up to date with disk. Only journal
+        bytes appended since the last call are parsed; a new snapshot or a
+        replaced journal (compaction by another process) triggers a rebuild.
+        """
+        with self._lock:
+            try:
+                snapshot_signature = _file_signature(os.stat(REQUESTS_DB))
+            except FileNotFoundError:
+                snapshot_signature = None
+            try:
+                journal_stat = os.stat(REQUESTS_JOURNAL)
+            except FileNotFoundError:
+                journal_stat = None
+
+            journal_replaced = journal_stat is not None and self._journal_inode not in (None, journal_stat.st_ino)
+            if snapshot_signature != self._snapshot_signature or journal_replaced or \
+                    (journal_stat is not None and journal_stat.st_size < self._journal_offset):
+                self._reset_from_snapshot(snapshot_signature)
+
+            if journal_stat is not None and journal_stat.st_size > self._journal_offset:
+                with open(REQUESTS_JOURNAL, 'rb') as f:
+                    self._journal_inode = os.fstat(f.fileno()).st_ino
+                    f.seek(self._journal_offset)
+                    chunk = f.read()
+                # A line still being written by another process is left for the next refresh.
+                complete = chunk.rfind(b'\n') + 1
+                for line in chunk[:complete].splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        self._index.put(json.loads(line))
+                    except json.JSONDecodeError:
+                        app.logger.error(f"Skipping undecodable line in {REQUESTS_JOURNAL}.")
+                self._journal_offset += complete
+            return self._index
+
+    def _clear_journal(self):
+        # Replace rather than truncate, so other processes see a new inode and rebuild.
+        tmp_path = f"{REQUESTS_JOURNAL}.tmp"
+        open(tmp_path, 'wb').close()
+        os.replace(tmp_path, REQUESTS_JOURNAL)
+
+    def compact_requests(self):
+        """Folds the journal into requests.json and starts an empty journal."""
+        with self._lock:
+            merged = self._refresh_requests().records()
+            # Snapshot first: if we die before the journal is cleared, replaying it again is harmless.
+            _write_json_cached(REQUESTS_DB, merged)
+            self._clear_journal()
+            self._reset_from_snapshot(_file_signature(os.stat(REQUESTS_DB)))
+
+    # --- Backend interface ---
+
+    def load_components(self):
+        return _copy_records(_read_json_cached(COMPONENTS_DB))
+
+    def save_components(self, data):
+        _write_json_cached(COMPONENTS_DB, data)
+
+    def load_requests(self):
+        return _copy_records(self._refresh_requests().records())
+
+    def save_requests(self, data):
+        with self._lock:
+            _write_json_cached(REQUESTS_DB, data)
+            self._clear_journal()
+            self._reset_from_snapshot(_file_signature(os.stat(REQUESTS_DB)))
+
+    def load_users(self):
+        return _copy_records(_read_json_cached(USERS_DB))
+
+    def get_user(self, email):
+        return next((dict(u) for u in _read_json_cached(USERS_DB) if u['email'] == email), None)
+
+    def get_request(self, request_id):
+        with self._lock:
+            record = self._refresh_requests().get(request_id)
+            return dict(record) if record is not None else None
+
+    def find_requests(self, **filters):
+        with self._lock:
+            return _copy_records(self._refresh_requests().find(**filters))
+
+    def max_request_id(self):
+        with self._lock:
+            return self._refresh_requests().max_id()
+
+    def incharge_queue(self):
+        with self._lock:
+            queue_view = self._refresh_requests().queue_view()
+        return {bucket: {batch_id: _copy_records(records) for batch_id, records in batches.items()}
+                for bucket, batches in queue_view.items()}
+
+    def page_requests(self, before, limit, filters):
+        with self._lock:
+            return _copy_records(self._refresh_requests().page(before, limit, filters))
+
+    def iter_requests(self, status=None):
+        # Only record references are gathered under the lock; copies are made one at a time.
+        with self._lock:
+            index = self._refresh_requests()
+            records = index.find(status=status) if status else index.records()
+        for record in records:
+            yield dict(record)
+
+    def save_request_records(self, records):
+        payload = ''.join(json.dumps(record) + '\n' for record in records).encode()
+        with self._lock:
+            self._refresh_requests()
+            with open(REQUESTS_JOURNAL, 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+            # Reads our own lines back, along with anything another process appended first.
+            self._refresh_requests()
+            if journal_size >= REQUESTS_JOURNAL_COMPACT_BYTES:
+                self.compact_requests()
+
+    def load_sequence(self, name):
+        return (_read_json_cached(SEQUENCES_DB) or {}).get(name)
+
+    def load_sequences(self):
+        return dict(_read_json_cached(SEQUENCES_DB) or {})
+
+    def _apply_commit(self, changes):
+        if changes['sequences']:
+            sequences = dict(_read_json_cached(SEQUENCES_DB) or {})
+            sequences.update(changes['sequences'])
+            _write_json_cached(SEQUENCES_DB, sequences)
+        if changes['components'] is not None:
+            self.save_components(changes['components'])
+        if changes['requests'] is not None:
+            self.save_requests(changes['requests'])
+        if changes['request_records']:
+            self.save_request_records(changes['request_records'])
+
+    def commit(self, changes):
+        """
+        Applies one transaction's writes. When more than one file changes, the
+        whole change is first written to COMMIT_RECORD; a crash part-way
+        through is then rolled forward by recover() on the next transaction.
+        """
+        # A data version bump alone does not need the commit record: sequences are written first,
+        # so a crash can only leave the version ahead of the data, which costs one spurious reload.
+        files_touched = (bool(set(changes['sequences']) - {DATA_VERSION_SEQUENCE}) +
+                         (changes['components'] is not None) +
+                         (changes['requests'] is not None or bool(changes['request_records'])))
+        if files_touched < 2:
+            self._apply_commit(changes)
+            return
+        _write_json_cached(COMMIT_RECORD, [changes])
+        self._apply_commit(changes)
+        os.remove(COMMIT_RECORD)
+
+    def recover(self):
+        """Re-applies a commit that was interrupted after its record was written. Must hold the store lock."""
+        if not os.path.exists(COMMIT_RECORD):
+            return
+        pending = _read_json_cached(COMMIT_RECORD)
+        if pending:
+            app.logger.warning(f"Rolling forward an interrupted commit from {COMMIT_RECORD}.")
+            self._apply_commit(pending[0])
+        os.remove(COMMIT_RECORD)
+
+
+class SqliteBackend:
+    """
+    One SQLite file in WAL mode. Each record is stored whole as JSON in `data`;
+    the fields routes filter on are copied into indexed columns next to it.
+    """
+
+    REQUEST_COLUMNS = ('batch_id', 'status', 'student_email', 'due_date', 'component_name',
+                       'request_timestamp', 'project_type', 'student_dept')
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY,
+            batch_id TEXT,
+            status TEXT,
+            student_email TEXT,
+            due_date TEXT,
+            component_name TEXT,
+            request_timestamp TEXT,
+            project_type TEXT,
+            student_dept TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_requests_batch_id ON requests (batch_id);
+        CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status);
+        CREATE INDEX IF NOT EXISTS idx_requests_student_email ON requests (student_email);
+        CREATE INDEX IF NOT EXISTS idx_requests_due_date ON requests (due_date);
+        CREATE INDEX IF NOT EXISTS idx_requests_component_name ON requests (component_name);
+        CREATE INDEX IF NOT EXISTS idx_requests_timestamp ON requests (request_timestamp, id);
+        CREATE TABLE IF NOT EXISTS components (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_components_name ON components (name);
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        import sqlite3  # Only this backend needs it; keep it off the startup path of the others.
+        # sqlite3 connections may not cross threads, so each worker thread gets its own.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._add_missing_columns(conn)
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _add_missing_columns(self, conn):
+        """Adds and backfills REQUEST_COLUMNS introduced after a database was created."""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(requests)")}
+        if not existing:
+            return
+        with conn:
+            for col in self.REQUEST_COLUMNS:
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE requests ADD COLUMN {col} TEXT")
+                    conn.execute(f"UPDATE requests SET {col} = json_extract(data, '$.{col}')")
+
+    def _select(self, sql, params=()):
+        return [json.loads(row[0]) for row in self._connect().execute(sql, params)]
+
+    def _request_row(self, record):
+        return (record['id'],) + tuple(record.get(col) for col in self.REQUEST_COLUMNS) + (json.dumps(record),)
+
+    def _upsert_requests(self, conn, records):
+        updates = ', '.join(f'{col} = excluded.{col}' for col in self.REQUEST_COLUMNS + ('data',))
+        conn.executemany(
+            f"INSERT INTO requests (id, {', '.join(self.REQUEST_COLUMNS)}, data) "
+            f"VALUES ({', '.join('?' * (len(self.REQUEST_COLUMNS) + 2))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}",
+            [self._request_row(r) for r in records])
+
+    def _replace_components(self, conn, data):
+        # Upsert rather than INSERT OR REPLACE so each row keeps its rowid, which is the display order.
+        conn.executemany(
+            "INSERT INTO components (id, name, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, data = excluded.data",
+            [(c['id'], c['name'], json.dumps(c)) for c in data])
+        conn.execute("DELETE FROM components WHERE id NOT IN (SELECT value FROM json_each(?))",
+                     (json.dumps([c['id'] for c in data]),))
+
+    def _replace_requests(self, conn, data):
+        self._upsert_requests(conn, data)
+        conn.execute("DELETE FROM requests WHERE id NOT IN (SELECT value FROM json_each(?))",
+                     (json.dumps([r['id'] for r in data]),))
+
+    def _replace_users(self, conn, data):
+        conn.executemany(
+            "INSERT INTO users (email, data) VALUES (?, ?) ON CONFLICT(email) DO UPDATE SET data = excluded.data",
+            [(u['email'], json.dumps(u)) for u in data])
+        conn.execute("DELETE FROM users WHERE email NOT IN (SELECT value FROM json_each(?))",
+                     (json.dumps([u['email'] for u in data]),))
+
+    def load_components(self):
+        return self._select("SELECT data FROM components ORDER BY rowid")
+
+    def save_components(self, data):
+        with self._connect() as conn:
+            self._replace_components(conn, data)
+
+    def load_requests(self):
+        return self._select("SELECT data FROM requests ORDER BY id")
+
+    def save_requests(self, data):
+        with self._connect() as conn:
+            self._replace_requests(conn, data)
+
+    def load_users(self):
+        return self._select("SELECT data FROM users ORDER BY rowid")
+
+    def get_user(self, email):
+        rows = self._select("SELECT data FROM users WHERE email = ?", (email,))
+        return rows[0] if rows else None
+
+    def get_request(self, request_id):
+        rows = self._select("SELECT data FROM requests WHERE id = ?", (request_id,))
+        return rows[0] if rows else None
+
+    def find_requests(self, **filters):
+        for field in filters:
+            if field not in self.REQUEST_COLUMNS:
+                raise ValueError(f"Cannot filter requests on unindexed field '{field}'.")
+        where = ' AND '.join(f'{field} = ?' for field in filters) or '1'
+        return self._select(f"SELECT data FROM requests WHERE {where} ORDER BY id", tuple(filters.values()))
+
+    def max_request_id(self):
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM requests").fetchone()[0]
+
+    def incharge_queue(self):
+        # The status index already narrows this to pending rows; grouping them is O(pending).
+        return group_incharge_queue(
+            self._select("SELECT data FROM requests WHERE status = 'Pending Incharge' ORDER BY id"))
+
+    def page_requests(self, before, limit, filters):
+        where, params = [], []
+        for field in ('status', 'project_type', 'student_dept'):
+            if filters.get(field):
+                where.append(f'{field} = ?')
+                params.append(filters[field])
+        if filters.get('exclude_statuses'):
+            where.append(f"status NOT IN ({', '.join('?' * len(filters['exclude_statuses']))})")
+            params.extend(filters['exclude_statuses'])
+        if filters.get('date_from'):
+            where.append('request_timestamp >= ?')
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            where.append('request_timestamp <= ?')
+            params.append(filters['date_to'] + '\uffff')
+        if filters.get('q'):
+            where.append("(CAST(id AS TEXT) = ? OR batch_id LIKE ? ESCAPE '\\' "
+                         "OR json_extract(data, '$.student_name') LIKE ? ESCAPE '\\' "
+                         "OR student_email LIKE ? ESCAPE '\\' OR component_name LIKE ? ESCAPE '\\')")
+            pattern = '%' + filters['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params.extend([filters['q'].strip()] + [pattern] * 4)
+        if before:
+            where.append("(request_timestamp, id) < (?, ?)")
+            params.extend(before)
+        sql = (f"SELECT data FROM requests WHERE {' AND '.join(where) or '1'} "
+               f"ORDER BY request_timestamp DESC, id DESC LIMIT ?")
+        return self._select(sql, tuple(params) + (limit,))
+
+    def iter_requests(self, status=None):
+        if status:
+            cursor = self._connect().execute("SELECT data FROM requests WHERE status = ? ORDER BY id", (status,))
+        else:
+            cursor = self._connect().execute("SELECT data FROM requests ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                yield json.loads(row[0])
+
+    def save_request_records(self, records):
+        with self._connect() as conn:
+            self._upsert_requests(conn, records)
+
+    def load_sequence(self, name):
+        row = self._connect().execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def load_sequences(self):
+        return dict(self._connect().execute("SELECT name, value FROM sequences").fetchall())
+
+    def commit(self, changes):
+        """Applies one transaction's writes inside a single SQLite transaction."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO sequences (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                changes['sequences'].items())
+            if changes['components'] is not None:
+                self._replace_components(conn, changes['components'])
+            if changes['requests'] is not None:
+                self._replace_requests(conn, changes['requests'])
+            if changes['request_records']:
+                self._upsert_requests(conn, changes['request_records'])
+
+    def recover(self):
+        """SQLite's own journal already makes each commit atomic."""
+
+    def has_data(self):
+        conn = self._connect()
+        return any(conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                   for table in ('requests', 'components', 'users'))
+
+    def import_from(self, source):
+        """Replaces the database contents with everything held by another backend, in one transaction."""
+        users, components, requests_ = source.load_users(), source.load_components(), source.load_requests()
+        sequences = source.load_sequences()
+        with self._connect() as conn:
+            self._replace_users(conn, users)
+            self._replace_components(conn, components)
+            self._replace_requests(conn, requests_)
+            # Counters continue where the source left off, so ids and batch numbers are never reused.
+            conn.execute("DELETE FROM sequences")
+            conn.executemany("INSERT INTO sequences (name, value) VALUES (?, ?)", sequences.items())
+        return len(users), len(components), len(requests_)
+
+
+# --- Domain Events ---
+# The events backend stores what happened rather than what is: each request
+# transition and stock change as a typed event. Requests carry only the
+# fields that changed, except RequestSubmitted, which carries the new record.
+
+# Event type for a request whose status changed to the key.
+REQUEST_STATUS_EVENTS = {
+    'Pending Incharge': 'MentorApproved',
+    'Approved': 'RequestApproved',
+    'ISSUED': 'Issued',
+    'Returned': 'Collected',
+    'Rejected': 'RequestRejected',
+    'Cancelled': 'RequestCancelled',
+    'Purchased': 'PurchaseCompleted',
+}
+
+
+def _field_changes(previous, record):
+    """The 'fields' (and, if any were dropped, 'unset') entries of an event turning `previous` into `record`."""
+    changes = {'fields': {field: value for field, value in record.items()
+                          if field not in previous or previous[field] != value}}
+    unset = [field for field in previous if field not in record]
+    if unset:
+        changes['unset'] = unset
+    return changes
+
+
+def _apply_field_changes(previous, event):
+    record = {**previous, **event['fields']}
+    for field in event.get('unset', ()):
+        record.pop(field, None)
+    return record
+
+
+def domain_events(index, components, changes):
+    """
+    The events a store transaction's changes amount to, given the current
+    state: a RequestIndex and an id -> component dict.
+    """
+    events = []
+    if changes['components'] is not None:
+        new_ids = {comp['id'] for comp in changes['components']}
+        for component_id in components:
+            if component_id not in new_ids:
+                events.append({'type': 'ComponentRemoved', 'component_id': component_id})
+        for comp in changes['components']:
+            previous = components.get(comp['id'])
+            if previous is None:
+                events.append({'type': 'ComponentAdded', 'component': comp})
+            elif previous != comp:
+                events.append({'type': 'InventoryAdjusted', 'component_id': comp['id'],
+                               **_field_changes(previous, comp)})
+
+    records = list(changes['requests'] or []) + list(changes['request_records'])
+    if changes['requests'] is not None:
+        kept = {record['id'] for record in changes['requests']}
+        removed = [request_id for request_id in index.by_id if request_id not in kept]
+        if removed:
+            events.append({'type': 'RequestsRemoved', 'request_ids': removed})
+    for record in records:
+        previous = index.get(record['id'])
+        if previous is None:
+            events.append({'type': 'RequestSubmitted', 'request': record})
+        elif previous != record:
+            if previous.get('status') == record.get('status'):
+                event_type = 'RequestUpdated'
+            else:
+                event_type = REQUEST_STATUS_EVENTS.get(record.get('status'), 'RequestUpdated')
+            events.append({'type': event_type, 'request_id': record['id'], **_field_changes(previous, record)})
+    return events
+
+
+def apply_domain_event(index, components, event):
+    """Applies one event to a RequestIndex and an id -> component dict."""
+    event_type = event['type']
+    if event_type == 'RequestSubmitted':
+        index.put(event['request'])
+    elif event_type == 'RequestsRemoved':
+        removed = set(event['request_ids'])
+        return RequestIndex([record for record in index.records() if record['id'] not in removed])
+    elif event_type == 'ComponentAdded':
+        components[event['component']['id']] = event['component']
+    elif event_type == 'ComponentRemoved':
+        components.pop(event['component_id'], None)
+    elif event_type == 'InventoryAdjusted':
+        components[event['component_id']] = _apply_field_changes(components[event['component_id']], event)
+    else:
+        # Records are replaced, never mutated: the index may share them with callers' snapshots.
+        index.put(_apply_field_changes(index.get(event['request_id']), event))
+    return index
+
+
+def _snapshot_entries():
+    """[seq, ts, offset, file name] for each snapshot, oldest first."""
+    return (_read_json_cached(SNAPSHOT_INDEX) or {}).get('snapshots', [])
+
+
+def _read_snapshot(entry):
+    with open(os.path.join(SNAPSHOT_DIR, entry[3])) as f:
+        snapshot = json.load(f)
+    return RequestIndex(snapshot['requests']), {comp['id']: comp for comp in snapshot['components']}
+
+
+def write_snapshot(seq, ts, offset, index, components):
+    """Writes the state after commit `seq` (log bytes up to `offset`) and lists it in SNAPSHOT_INDEX."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    name = f"snapshot-{seq:012d}.json"
+    path = os.path.join(SNAPSHOT_DIR, name)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump({'seq': seq, 'ts': ts, 'offset': offset, 'requests': index.records(),
+                   'components': list(components.values())}, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+    entries = [entry for entry in _snapshot_entries() if entry[0] != seq] + [[seq, ts, offset, name]]
+    _write_json_cached(SNAPSHOT_INDEX, {'snapshots': sorted(entries)})
+
+
+def _read_event_log(offset):
+    """(commit, end offset) for each complete line of EVENT_STORE after `offset`."""
+    try:
+        with open(EVENT_STORE, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # Still being written.
+                offset += len(raw)
+                if raw.strip():
+                    yield json.loads(raw), offset
+    except FileNotFoundError:
+        return
+
+
+def reconstruct_state(at):
+    """
+    The requests and components as they stood at timestamp `at` (a
+    'YYYY-MM-DD[ HH:MM[:SS]]' prefix, inclusive): the last snapshot taken by
+    then, plus the logged commits up to it. Returns (RequestIndex, id ->
+    component dict, seq of the last commit applied).
+    """
+    if len(at) < 19:
+        at = at + '\uffff'  # Include every commit whose timestamp merely starts with `at`.
+    entries = [entry for entry in _snapshot_entries() if entry[1] <= at]
+    if not entries:
+        raise ValueError("That is before the first snapshot; there is no state to reconstruct.")
+    seq, _ts, offset, _name = entries[-1]
+    index, components = _read_snapshot(entries[-1])
+    for commit, _end in _read_event_log(offset):
+        if commit['ts'] > at:
+            break
+        for event in commit['events']:
+            index = apply_domain_event(index, components, event)
+        seq = commit['seq']
+    return index, components, seq
+
+
+class EventBackend(JsonBackend):
+    """
+    Requests and components rebuilt from EVENT_STORE: the latest snapshot is
+    loaded once, then each refresh applies the commit lines appended since,
+    by this process or another. Users and sequences stay in their JSON files.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._components = {}
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._log_offset = None
+
+    def _refresh_requests(self):
+        with self._lock:
+            if self._log_offset is None:
+                self._load_latest_snapshot()
+            elif os.path.exists(EVENT_STORE) and os.path.getsize(EVENT_STORE) < self._log_offset:
+                app.logger.error(f"{EVENT_STORE} is shorter than already read; reloading from the last snapshot.")
+                self._load_latest_snapshot()
+            for commit, end in _read_event_log(self._log_offset):
+                for event in commit['events']:
+                    self._index = apply_domain_event(self._index, self._components, event)
+                self._seq = commit['seq']
+                self._log_offset = end
+            return self._index
+
+    def _load_latest_snapshot(self):
+        entries = _snapshot_entries()
+        if entries:
+            self._index, self._components = _read_snapshot(entries[-1])
+            self._seq, _ts, self._log_offset, _name = entries[-1]
+        else:
+            self._index, self._components, self._seq, self._log_offset = RequestIndex(), {}, 0, 0
+        self._snapshot_seq = self._seq
+
+    def compact_requests(self):
+        """Writes a snapshot of the current state."""
+        with self._lock:
+            self._refresh_requests()
+            write_snapshot(self._seq, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self._log_offset,
+                           self._index, self._components)
+            self._snapshot_seq = self._seq
+
+    def load_components(self):
+        with self._lock:
+            self._refresh_requests()
+            return _copy_records(self._components.values())
+
+    def commit(self, changes):
+        """
+        Appends the transaction's domain events as one line, so a commit is
+        either wholly in the log or (torn by a crash) cut off by recover().
+        """
+        with self._lock:
+            if changes['sequences']:
+                sequences = dict(_read_json_cached(SEQUENCES_DB) or {})
+                sequences.update(changes['sequences'])
+                _write_json_cached(SEQUENCES_DB, sequences)
+            self._refresh_requests()
+            events = domain_events(self._index, self._components, changes)
+            if not events:
+                return
+            line = json.dumps({'seq': self._seq + 1, 'ts': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                               'events': events}, separators=(',', ':')) + '\n'
+            with open(EVENT_STORE, 'ab') as f:
+                f.write(line.encode())
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh_requests()
+            if self._seq - self._snapshot_seq >= SNAPSHOT_EVERY_COMMITS:
+                self.compact_requests()
+
+    def recover(self):
+        """Cuts off a commit line left half-written by a crash. Must hold the store lock."""
+        try:
+            with open(EVENT_STORE, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if not size:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b'\n':
+                    return
+                f.seek(0)
+                complete = f.read().rfind(b'\n') + 1
+                app.logger.warning(f"Discarding a torn commit at the end of {EVENT_STORE}.")
+                f.truncate(complete)
+        except FileNotFoundError:
+            pass
+
+    def has_data(self):
+        return bool(_snapshot_entries()) or os.path.exists(EVENT_STORE)
+
+    def import_from(self, source):
+        """Starts the log from another backend's state, as snapshot 0."""
+        components, requests_ = source.load_components(), source.load_requests()
+        open(EVENT_STORE, 'wb').close()
+        write_snapshot(0, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 0,
+                       RequestIndex(requests_), {comp['id']: comp for comp in components})
+        self._log_offset = None
+        return len(components), len(requests_)
+
+
+def _make_storage_backend():
+    if STORAGE_BACKEND == 'json':
+        return JsonBackend()
+    if STORAGE_BACKEND == 'sqlite':
+        return SqliteBackend(SQLITE_DB)
+    if STORAGE_BACKEND == 'events':
+        return EventBackend()
+    raise ValueError(f"Unknown RACELAB_STORAGE '{STORAGE_BACKEND}'. Use 'json', 'sqlite' or 'events'.")
+
+
+storage = _make_storage_backend()
+
+
+# --- Store Transactions ---
+# Every write goes through store_transaction(). It holds an exclusive flock on
+# STORE_LOCK_FILE, so a load-mutate-save sequence in one worker process cannot
+# interleave with another's. Saves made inside the block are buffered and
+# committed together when it exits cleanly; an exception discards them.
+
+_transaction_local = threading.local()
+_fallback_store_lock = threading.RLock()
+
+
+@contextmanager
+def _exclusive_lock(path):
+    """Exclusive flock on `path`, held against other threads and worker processes alike."""
+    with open(path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            _fallback_store_lock.acquire()
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                _fallback_store_lock.release()
+
+
+@contextmanager
+def _shared_lock(path):
+    """Shared flock on `path`: any number of holders, but none while an _exclusive_lock is held."""
+    with open(path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+        else:
+            _fallback_store_lock.acquire()
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                _fallback_store_lock.release()
+
+
+class StoreTransaction:
+    def __init__(self):
+        self.components = None
+        self.requests = None
+        self.request_records = {}
+        self.sequences = {}
+
+    def has_changes(self):
+        return (self.components is not None or self.requests is not None or
+                bool(self.request_records) or bool(self.sequences))
+
+    def changes(self):
+        return {
+            'components': self.components,
+            'requests': self.requests,
+            'request_records': list(self.request_records.values()),
+            'sequences': self.sequences,
+        }
+
+
+@contextmanager
+def store_transaction():
+    """
+    Locks the store for a read-modify-write. Reads inside the block see the
+    latest committed state (not the block's own pending saves).
+    """
+    outer = getattr(_transaction_local, 'tx', None)
+    if outer is not None:
+        # Nested use joins the enclosing transaction.
+        yield outer
+        return
+
+    with _exclusive_lock(STORE_LOCK_FILE):
+        storage.recover()
+        tx = StoreTransaction()
+        _transaction_local.tx = tx
+        try:
+            yield tx
+        finally:
+            _transaction_local.tx = None
+        if tx.has_changes():
+            tx.sequences[DATA_VERSION_SEQUENCE] = (storage.load_sequence(DATA_VERSION_SEQUENCE) or 0) + 1
+            changes = tx.changes()
+            previous_components = storage.load_components() if changes['components'] is not None else None
+            storage.commit(changes)
+            _publish_commit(changes, previous_components)
+
+
+# --- Live Events ---
+class EventBus:
+    """
+    Fans commit events out to subscriber queues. publish() hands an event to
+    this worker's subscribers directly and appends it to EVENTS_LOG; a tailer
+    thread, started with the first subscriber, delivers the events other
+    workers append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._tailer = None
+
+    def subscribe(self):
+        subscription = queue.SimpleQueue()
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._tailer is None:
+                self._tailer = threading.Thread(target=self._tail, name='event-bus-tailer', daemon=True)
+                self._tailer.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def publish(self, event):
+        """Must be called under the store lock, which keeps EVENTS_LOG in commit order."""
+        self._deliver(event)
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+        try:
+            if os.path.getsize(self.path) + len(line) > EVENTS_LOG_MAX_BYTES:
+                # Replace rather than truncate, so tailers see a new inode and finish the old file first.
+                open(f"{self.path}.tmp", 'wb').close()
+                os.replace(f"{self.path}.tmp", self.path)
+        except FileNotFoundError:
+            pass
+        with open(self.path, 'ab') as f:
+            f.write(line)
+
+    def _tail(self):
+        f, partial, start_at_end = None, b'', True
+        while True:
+            time.sleep(EVENTS_POLL_SECONDS)
+            try:
+                if f is None:
+                    f = open(self.path, 'rb')
+                    if start_at_end:
+                        f.seek(0, os.SEEK_END)
+                    start_at_end = False
+                # Checked before reading: once the file is replaced nothing more is written to the old one.
+                rotated = os.stat(self.path).st_ino != os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                start_at_end = False
+                continue
+            chunk = partial + f.read()
+            complete = chunk.rfind(b'\n') + 1
+            partial = chunk[complete:]
+            for line in chunk[:complete].splitlines():
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get('pid') != os.getpid():
+                    self._deliver(event)
+            if rotated:
+                f.close()
+                f, partial = None, b''
+
+
+event_bus = EventBus(EVENTS_LOG)
+
+
+def _publish_commit(changes, previous_components):
+    """Publishes the requests and components one commit changed; a whole-history save only asks clients to reload."""
+    event = {'version': changes['sequences'][DATA_VERSION_SEQUENCE], 'pid': os.getpid(),
+             'requests': changes['request_records'], 'components': []}
+    if changes['requests'] is not None:
+        event['resync'] = True
+    if changes['components'] is not None:
+        previous = {comp['id']: comp for comp in previous_components}
+        event['components'] = [comp for comp in changes['components'] if previous.get(comp['id']) != comp]
+    if not (event['requests'] or event['components'] or event.get('resync')):
+        return
+    try:
+        event_bus.publish(event)
+    except OSError as e:
+        # The commit itself has succeeded; live views just miss this update.
+        app.logger.error(f"Failed to publish commit {event['version']}: {e}")
+
+
+# --- Storage Helper Functions ---
+# Loads hand out copies: callers mutate what they load and save it back.
+
+def load_components():
+    """Loads all components, in catalog order."""
+    return storage.load_components()
+
 
 def save_components(data):
-    with open(COMPONENTS_DB, 'w') as f: json.dump(data, f, indent=4)
+    with store_transaction() as tx:
+        tx.components = _copy_records(data)
+        tx.sequences.setdefault(INVENTORY_VERSION_SEQUENCE,
+                                (storage.load_sequence(INVENTORY_VERSION_SEQUENCE) or 0) + 1)
 
 
 def load_requests():
-    """Loads requests.json safely."""
-    if not os.path.exists(REQUESTS_DB) or os.path.getsize(REQUESTS_DB) == 0: return []
-    try:
-        with open(REQUESTS_DB, 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        app.logger.error(f"Failed to decode {REQUESTS_DB}. Returning empty list.")
-        return []
+    """Loads the full request history. Prefer get_request/find_requests for lookups."""
+    return storage.load_requests()
 
 
 def save_requests(data):
-    with open(REQUESTS_DB, 'w') as f: json.dump(data, f, indent=4)
+    with store_transaction() as tx:
+        tx.requests = _copy_records(data)
+        tx.request_records.clear()
+
+
+def get_request(request_id):
+    return storage.get_request(request_id)
+
+
+def find_requests(**filters):
+    """Requests whose fields equal every keyword given, e.g. find_requests(batch_id=b, status='Approved')."""
+    return storage.find_requests(**filters)
+
+
+def save_request_records(records):
+    """Persists new or changed request records without touching the rest of the history."""
+    with store_transaction() as tx:
+        for record in records:
+            tx.request_records[record['id']] = dict(record)
+
+
+def max_request_id():
+    """Highest request id ever used, archived requests included."""
+    archived_max = max((segment['max_id'] for segment in load_archive_manifest()['segments']), default=0)
+    return max(storage.max_request_id(), archived_max)
+
+
+def iter_requests(status=None, project_type=None, date_from=None, date_to=None, include_archived=False):
+    """
+    Yields requests one at a time, so exports never hold the whole history:
+    archived ones first (when asked for), then live ones in id order. Dates
+    are 'YYYY-MM-DD' and match request_timestamp inclusively.
+    """
+    archived_ids = set()
+    if include_archived and (status is None or status in CLOSED_STATUSES):
+        for req in iter_archived_requests(date_from=date_from, date_to=date_to):
+            archived_ids.add(req['id'])
+            if request_matches(req, {'status': status, 'project_type': project_type,
+                                     'date_from': date_from, 'date_to': date_to}):
+                yield req
+    for req in storage.iter_requests(status=status):
+        if req['id'] in archived_ids:
+            continue  # Left behind by an archive run that died before trimming the live store.
+        submitted_on = (req.get('request_timestamp') or '')[:10]
+        if project_type and req.get('project_type') != project_type:
+            continue
+        if date_from and submitted_on < date_from:
+            continue
+        if date_to and submitted_on > date_to:
+            continue
+        yield req
+
+
+def load_incharge_queue():
+    """
+    Requests waiting on the incharge, as {bucket: {batch_id: [record, ...]}}
+    for the buckets in INCHARGE_QUEUE_BUCKETS. Read from a view the store
+    keeps current, so it costs O(pending) rather than O(all requests).
+    """
+    return storage.incharge_queue()
+
+
+def page_requests(cursor=None, limit=REQUEST_PAGE_SIZE, include_archived=False, **filters):
+    """
+    One page of requests, newest first, plus the cursor of the page after it
+    (None on the last page). Pages are keyed on (request_timestamp, id), so
+    fetching one costs the same however long the history grows. See
+    request_matches() for the filters; archived requests are merged in only
+    when `include_archived` is set.
+    """
+    before = None
+    if cursor:
+        timestamp, _, request_id = cursor.rpartition('|')
+        if request_id.isdigit():
+            before = (timestamp, int(request_id))
+    records = storage.page_requests(before, limit + 1, filters)
+    if include_archived:
+        archived = {record['id']: record for record in _page_archived_requests(before, limit + 1, filters)}
+        records = [record for record in records if record['id'] not in archived] + list(archived.values())
+        records = sorted(records, key=request_sort_key, reverse=True)[:limit + 1]
+    if len(records) <= limit:
+        return records, None
+    last = request_sort_key(records[limit - 1])
+    return records[:limit], f"{last[0]}|{last[1]}"
+
+
+def allocate_sequence(name, count=1, seed=lambda: 0):
+    """
+    Reserves `count` consecutive values from a persisted, lock-protected
+    counter and returns the first. `seed` supplies the starting point the
+    first time a counter is used.
+    """
+    with store_transaction() as tx:
+        current = tx.sequences.get(name)
+        if current is None:
+            current = storage.load_sequence(name)
+        if current is None:
+            current = seed()
+        tx.sequences[name] = current + count
+        return current + 1
+
+
+def new_batch_id(submitted_at):
+    """The submission time keeps batch ids readable; the sequence number keeps them unique."""
+    return f"B-{submitted_at.strftime('%Y%m%d%H%M%S')}-{allocate_sequence('batch_id'):04d}"
+
+
+def save_new_requests(records, batch_submitted_at=None):
+    """
+    Gives new records the next request ids and persists them in the same
+    transaction. With `batch_submitted_at`, they also share a new batch id,
+    and those waiting on a mentor get the batch's signed approval token.
+    """
+    with store_transaction():
+        if batch_submitted_at is not None:
+            batch_id = new_batch_id(batch_submitted_at)
+            for record in records:
+                record['batch_id'] = batch_id
+                if record['status'] == 'Pending Mentor':
+                    record['mentor_approval_token'] = s.dumps(batch_id)
+        next_id = allocate_sequence('request_id', len(records), seed=max_request_id)
+        for offset, record in enumerate(records):
+            record['id'] = next_id + offset
+        save_request_records(records)
 
 
 def load_staff_users():
-    """Loads users.json safely."""
-    if not os.path.exists(USERS_DB) or os.path.getsize(USERS_DB) == 0:
-        return []
-    try:
-        with open(USERS_DB, 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        app.logger.error(f"Failed to decode {USERS_DB}. Returning empty list.")
-        return []
+    """Loads all staff accounts."""
+    return storage.load_users()
 
 
 def get_staff_by_email(email):
-    for user in load_staff_users():
-        if user['email'] == email:
-            return user
-    return None
+    return storage.get_user(email)
+
+
+@app.cli.command('migrate-json')
+@click.option('--force', is_flag=True, help='Overwrite a database that already holds data.')
+def migrate_json_command(force):
+    """Copies users.json, components.json, requests.json and sequences.json into the SQLite database."""
+    target = SqliteBackend(SQLITE_DB)
+    if target.has_data() and not force:
+        raise click.ClickException(f"{SQLITE_DB} already holds data. Re-run with --force to overwrite it.")
+    users, components, requests_ = target.import_from(JsonBackend())
+    click.echo(f"Migrated {users} users, {components} components and {requests_} requests into {SQLITE_DB}. "
+               f"Set RACELAB_STORAGE=sqlite to use it.")
+
+
+@app.cli.command('migrate-events')
+@click.option('--force', is_flag=True, help='Discard an event log that already exists.')
+def migrate_events_command(force):
+    """Starts the domain event log from components.json and requests.json."""
+    target = storage if isinstance(storage, EventBackend) else EventBackend()
+    if target.has_data() and not force:
+        raise click.ClickException(f"{EVENT_STORE} already exists. Re-run with --force to start it over.")
+    with _exclusive_lock(STORE_LOCK_FILE):
+        components, requests_ = target.import_from(JsonBackend())
+    click.echo(f"Seeded {EVENT_STORE} with {components} components and {requests_} requests. "
+               f"Set RACELAB_STORAGE=events to use it.")
+
+
+@app.cli.command('snapshot')
+def snapshot_command():
+    """Writes a snapshot of the event-sourced state now."""
+    if not isinstance(storage, EventBackend):
+        raise click.ClickException("Snapshots need RACELAB_STORAGE=events.")
+    with _exclusive_lock(STORE_LOCK_FILE):
+        storage.recover()
+        storage.compact_requests()
+    click.echo(f"Snapshot written to {SNAPSHOT_DIR}.")
+
+
+@app.cli.command('state-at')
+@click.argument('at')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the state here instead of stdout.')
+def state_at_command(at, output):
+    """Prints the requests and components as they stood at AT ('YYYY-MM-DD[ HH:MM[:SS]]')."""
+    try:
+        with _shared_lock(STORE_LOCK_FILE):
+            index, components, seq = reconstruct_state(at)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    state = json.dumps({'at': at, 'seq': seq, 'requests': index.records(),
+                        'components': list(components.values())}, indent=4)
+    if output:
+        with open(output, 'w') as f:
+            f.write(state)
+        click.echo(f"State at {at} (commit {seq}) written to {output}.")
+    else:
+        click.echo(state)
 
 
-# --- CORRECTED AUGMENTED COMPONENTS FUNCTION ---
-def get_augmented_components():
+# --- Request Archive ---
+# Closed requests are moved out of the live store into gzipped JSON-lines
+# segments under ARCHIVE_DIR, one per month of request_timestamp per archive
+# run. Segments are never rewritten. ARCHIVE_MANIFEST lists each one with its
+# month, ids and student emails, so readers only open segments that can match.
+
+def load_archive_manifest():
+    return _read_json_cached(ARCHIVE_MANIFEST) or {'segments': []}
+
+
+@lru_cache(maxsize=32)
+def _read_archive_segment(name):
+    # Segments are immutable, so caching them by name is always safe.
+    with gzip.open(os.path.join(ARCHIVE_DIR, name), 'rt', encoding='utf-8') as f:
+        return tuple(json.loads(line) for line in f if line.strip())
+
+
+def _write_archive_segment(name, records):
+    path = os.path.join(ARCHIVE_DIR, name)
+    with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    os.replace(f"{path}.tmp", path)
+
+
+def iter_archived_requests(student_email=None, date_from=None, date_to=None):
+    """Archived requests, oldest month first. Segments outside the email or date range are never opened."""
+    for segment in sorted(load_archive_manifest()['segments'], key=lambda seg: seg['file']):
+        if student_email and student_email not in segment['emails']:
+            continue
+        if (date_from and segment['month'] < date_from[:7]) or (date_to and segment['month'] > date_to[:7]):
+            continue
+        for record in _read_archive_segment(segment['file']):
+            if student_email and record.get('student_email') != student_email:
+                continue
+            yield dict(record)
+
+
+def _page_archived_requests(before, limit, filters):
+    """Archive counterpart of storage.page_requests(): reads months newest first until the page is full."""
+    if filters.get('status') and filters['status'] not in CLOSED_STATUSES:
+        return []
+    segments = load_archive_manifest()['segments']
+    records = []
+    for month in sorted({segment['month'] for segment in segments}, reverse=True):
+        if len(records) >= limit:
+            break
+        if (before and month > before[0][:7]) or (filters.get('date_to') and month > filters['date_to'][:7]):
+            continue
+        if filters.get('date_from') and month < filters['date_from'][:7]:
+            break
+        in_month = [record for segment in segments if segment['month'] == month
+                    for record in _read_archive_segment(segment['file'])
+                    if request_matches(record, filters) and (not before or request_sort_key(record) < before)]
+        records.extend(sorted(in_month, key=request_sort_key, reverse=True))
+    return [dict(record) for record in records[:limit]]
+
+
+def archive_closed_requests(older_than_days=ARCHIVE_AFTER_DAYS):
+    """
+    Moves requests in CLOSED_STATUSES submitted more than `older_than_days`
+    ago out of the live store into new archive segments. Returns how many moved.
     """
-    Loads components from JSON and calculates the 'available' count.
-    It trusts the 'working_quantity' and 'issued_quantity'
-    fields which are correctly managed by the technician routes.
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M')
+    with store_transaction():
+        segments = list(load_archive_manifest()['segments'])
+        archived_ids = {request_id for segment in segments for request_id in segment['ids']}
+        live = load_requests()
+        moving = [req for req in live if req['id'] not in archived_ids and req.get('status') in CLOSED_STATUSES
+                  and req.get('request_timestamp') and req['request_timestamp'] < cutoff]
+        if not moving and not any(req['id'] in archived_ids for req in live):
+            return 0
+
+        by_month = {}
+        for req in moving:
+            by_month.setdefault(req['request_timestamp'][:7], []).append(req)
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        for month, records in sorted(by_month.items()):
+            part = sum(1 for segment in segments if segment['month'] == month) + 1
+            name = f"requests-{month}.{part:04d}.jsonl.gz"
+            _write_archive_segment(name, records)
+            segments.append({'file': name, 'month': month, 'count': len(records),
+                             'max_id': max(req['id'] for req in records),
+                             'ids': [req['id'] for req in records],
+                             'emails': sorted({req.get('student_email') or '' for req in records})})
+        # Listing the segments in the manifest is what archives them; only then are they dropped from the live store.
+        _write_json_cached(ARCHIVE_MANIFEST, {'segments': segments})
+        archived_ids.update(req['id'] for req in moving)
+        save_requests([req for req in live if req['id'] not in archived_ids])
+    app.logger.info(f"Archived {len(moving)} closed requests into {ARCHIVE_DIR}.")
+    return len(moving)
+
+
+@app.cli.command('archive-requests')
+@click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help='Only archive requests submitted at least this many days ago.')
+def archive_requests_command(days):
+    """Moves old Returned, Cancelled, Rejected and Purchased requests into the archive."""
+    moved = archive_closed_requests(days)
+    click.echo(f"Archived {moved} closed requests into {ARCHIVE_DIR}/.")
+
+
+# --- Component Catalog ---
+class ComponentCatalog:
+    """
+    The component list plus dict lookups by id, exact name and case-folded
+    name. Every component carries its 'available' count as a field; call
+    refresh() after changing a component's quantities.
+
+    It is also the stock ledger: 'reserved_quantity' holds the quantity of
+    every open request flagged 'stock_reserved', kept current by reserve(),
+    release() and issue() at each request transition, so 'available'
+    already excludes stock promised to requests not yet issued.
     """
-    components = load_components()
-    augmented_components = []
 
-    for comp in components:
+    def __init__(self, components):
+        self.components = components
+        # Set by the ledger methods, so callers only save the catalog when a reservation moved.
+        self.reservations_changed = False
+        self.by_id = {}
+        self.by_name = {}
+        self.by_folded_name = {}
+        for comp in components:
+            self._link(comp)
+
+    def _link(self, comp):
+        self.refresh(comp)
+        self.by_id[comp['id']] = comp
+        self.by_name[comp['name']] = comp
+        self.by_folded_name[comp['name'].casefold()] = comp
+
+    def refresh(self, comp):
+        """
+        Fills in missing quantity fields and recalculates 'available'. It
+        trusts 'working_quantity' and 'issued_quantity', which are managed by
+        the technician routes, and 'reserved_quantity', managed by the ledger
+        methods below.
+        """
         # Get quantities, using .get() with a default of 0 for safety
         working_qty = comp.get('working_quantity', 0)
         issued_qty = comp.get('issued_quantity', 0)
+        reserved_qty = comp.get('reserved_quantity', 0)
 
         # Set default values for any missing keys in the component object
         # This prevents errors in the templates if a component is missing data
@@ -116,19 +1796,236 @@ def get_augmented_components():
         comp.setdefault('working_quantity', working_qty)
         comp.setdefault('not_working_quantity', 0)
         comp.setdefault('issued_quantity', issued_qty)
+        comp.setdefault('reserved_quantity', reserved_qty)
 
         # Calculate the 'available' count
-        comp['available'] = working_qty - issued_qty
+        comp['available'] = working_qty - issued_qty - reserved_qty
 
         # Ensure 'available' is not negative
         if comp['available'] < 0:
             comp['available'] = 0
             app.logger.warning(
-                f"Component {comp['name']} has negative availability. {working_qty} working, {issued_qty} issued.")
+                f"Component {comp['name']} has negative availability. {working_qty} working, {issued_qty} issued, "
+                f"{reserved_qty} reserved.")
+
+    def __iter__(self):
+        return iter(self.components)
+
+    def __len__(self):
+        return len(self.components)
+
+    def get(self, component_id):
+        return self.by_id.get(component_id)
+
+    def find_by_name(self, name, ignore_case=False):
+        if ignore_case:
+            return self.by_folded_name.get(name.casefold())
+        return self.by_name.get(name)
+
+    def add(self, comp):
+        self.components.append(comp)
+        self._link(comp)
+
+    def reserve(self, req, force=False):
+        """
+        Sets a borrow request's quantity aside for it. Returns False, changing
+        nothing, if the component is unknown or (unless `force`) too little
+        is available. A request that already holds stock is left as it is.
+        """
+        if req.get('stock_reserved'):
+            return True
+        comp = self.find_by_name(req['component_name'])
+        if not comp or (not force and comp['available'] < req['quantity']):
+            return False
+        comp['reserved_quantity'] += req['quantity']
+        self.refresh(comp)
+        req['stock_reserved'] = True
+        self.reservations_changed = True
+        return True
+
+    def release(self, req):
+        """Returns a request's reserved stock, e.g. when it is rejected or cancelled."""
+        if not req.get('stock_reserved'):
+            return
+        comp = self.find_by_name(req['component_name'])
+        if comp:
+            comp['reserved_quantity'] = max(comp['reserved_quantity'] - req['quantity'], 0)
+            self.refresh(comp)
+            self.reservations_changed = True
+        req['stock_reserved'] = False
+
+    def issuable(self, req):
+        """Stock the request could be issued from: what is available plus what it already holds."""
+        comp = self.find_by_name(req['component_name'])
+        held = req['quantity'] if req.get('stock_reserved') else 0
+        return comp['working_quantity'] - comp['issued_quantity'] - comp['reserved_quantity'] + held
+
+    def issue(self, req):
+        """Moves a request's quantity from reserved (if it held any) to issued."""
+        self.release(req)
+        comp = self.find_by_name(req['component_name'])
+        comp['issued_quantity'] += req['quantity']
+        self.refresh(comp)
+
+    def records(self):
+        """The components as stored, without the computed 'available' field."""
+        return [{k: v for k, v in comp.items() if k != 'available'} for comp in self.components]
+
+
+def load_catalog():
+    return ComponentCatalog(load_components())
+
+
+def save_catalog(catalog):
+    save_components(catalog.records())
+
+
+def get_augmented_components():
+    """Loads all components, each with its calculated 'available' count."""
+    return load_catalog().components
+
+
+def submit_borrow_requests(records, batch_submitted_at=None):
+    """
+    Saves new borrow requests with their stock reserved, in one transaction.
+    Returns the first request its component can no longer cover (nothing is
+    saved then), or None. `batch_submitted_at` is passed to save_new_requests().
+    """
+    with store_transaction():
+        catalog = load_catalog()
+        for record in records:
+            if not catalog.reserve(record):
+                return record
+        save_catalog(catalog)
+        save_new_requests(records, batch_submitted_at)
+    return None
+
+
+def rebuild_reservations():
+    """
+    Recomputes every component's reserved_quantity from the open borrow
+    requests, reserving for each even where that over-commits the stock.
+    Returns the names of components left over-committed.
+    """
+    with store_transaction():
+        catalog = load_catalog()
+        for comp in catalog:
+            comp['reserved_quantity'] = 0
+            catalog.refresh(comp)
+        changed = []
+        for status in RESERVING_STATUSES:
+            for req in find_requests(status=status):
+                if req['request_type'] != 'borrow':
+                    continue
+                was_reserved = req.get('stock_reserved')
+                req['stock_reserved'] = False
+                if not catalog.reserve(req, force=True):
+                    req['stock_reserved'] = False  # Component no longer in the catalog.
+                if req['stock_reserved'] != was_reserved:
+                    changed.append(req)
+        save_catalog(catalog)
+        save_request_records(changed)
+    return [comp['name'] for comp in catalog
+            if comp['working_quantity'] - comp['issued_quantity'] - comp['reserved_quantity'] < 0]
+
+
+def _mentor_link_expired(req):
+    if not req.get('mentor_approval_token'):
+        return False
+    try:
+        s.loads(req['mentor_approval_token'], max_age=MENTOR_LINK_MAX_AGE)
+    except SignatureExpired:
+        return True
+    except BadSignature:
+        return False
+    return False
+
+
+def expire_mentor_requests():
+    """
+    Rejects Pending Mentor requests whose approval link has lapsed, which no
+    one can act on any more, and releases their reserved stock. Returns the
+    number rejected. The lock is only taken when there is something to do.
+    """
+    if not any(_mentor_link_expired(req) for req in find_requests(status='Pending Mentor')):
+        return 0
+    with store_transaction():
+        catalog = load_catalog()
+        expired = [req for req in find_requests(status='Pending Mentor') if _mentor_link_expired(req)]
+        for req in expired:
+            req['status'] = 'Rejected'
+            req['mentor_approval_token'] = None
+            req['mentor_remarks'] = 'Mentor approval link expired.'
+            catalog.release(req)
+            audit_event('MENTOR LINK EXPIRED', 'System', request_id=req['id'], component=req['component_name'],
+                        before={'status': 'Pending Mentor'}, after={'status': 'Rejected'})
+        if catalog.reservations_changed:
+            save_catalog(catalog)
+        save_request_records(expired)
+    return len(expired)
+
+
+@app.cli.command('expire-mentor-requests')
+def expire_mentor_requests_command():
+    """Rejects requests whose mentor approval link has lapsed; run it from cron."""
+    click.echo(f"Rejected {expire_mentor_requests()} request(s) with an expired mentor link.")
+
+
+@app.cli.command('rebuild-reservations')
+def rebuild_reservations_command():
+    """Recomputes reserved stock from the open requests, e.g. after upgrading or restoring a backup."""
+    overcommitted = rebuild_reservations()
+    click.echo("Reservations rebuilt.")
+    for name in overcommitted:
+        click.echo(f"Warning: {name} has more reserved and issued than working stock.")
+
+
+# --- Fragment Cache ---
+class FragmentCache:
+    """A bounded LRU of rendered template fragments, shared by this worker's threads."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
-        augmented_components.append(comp)
 
-    return augmented_components
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+
+def inventory_version():
+    return storage.load_sequence(INVENTORY_VERSION_SEQUENCE) or 0
+
+
+def render_inventory_fragment(macro_name):
+    """
+    Renders one of the inventory_tables.html macros over the current
+    components, once per inventory version. Fragments of older versions
+    simply age out of the LRU.
+    """
+    key = (macro_name, inventory_version())
+    html = fragment_cache.get(key)
+    if html is None:
+        # The shared lock keeps a commit from landing between reading the version and the components.
+        with _shared_lock(STORE_LOCK_FILE):
+            key = (macro_name, inventory_version())
+            html = get_template_attribute('inventory_tables.html', macro_name)(get_augmented_components())
+        fragment_cache.put(key, html)
+    return html
 
 
 # --- Email Parsing Logic (Unchanged) ---
@@ -191,15 +2088,258 @@ def parse_faculty_email(email):
         return None
 
 
+# --- Static Assets ---
+@lru_cache(maxsize=1)
+def _brotli():
+    """The optional brotli module, imported on first use; None without it (gzip is used alone then)."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _static_compressible(filename):
+    mimetype = mimetypes.guess_type(filename)[0] or ''
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _build_static_asset(filename):
+    """
+    Hashes one file under static/ and writes its precompressed copies into
+    STATIC_BUILD_DIR, unless a copy of the same content is already there.
+    A copy that cannot be written is skipped; the file is then sent as is.
+    """
+    source = os.path.join(app.static_folder, filename)
+    with open(source, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    asset = {'digest': digest, 'path': source, 'mtime': os.stat(source).st_mtime, 'encodings': {}}
+    if not _static_compressible(filename):
+        return asset
+    compressors = {'gzip': ('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))}
+    if _brotli():
+        compressors['br'] = ('.br', lambda raw: _brotli().compress(raw, quality=11))
+    for encoding, (suffix, compress) in compressors.items():
+        target = os.path.abspath(os.path.join(STATIC_BUILD_DIR, f"{filename}.{digest}{suffix}"))
+        if not os.path.exists(target):
+            packed = compress(data)
+            if len(packed) >= len(data):
+                continue
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target + '.tmp', 'wb') as f:
+                    f.write(packed)
+                os.replace(target + '.tmp', target)
+            except OSError as e:
+                app.logger.warning(f"Could not write {target}: {e}")
+                continue
+        asset['encodings'][encoding] = target
+    return asset
+
+
+def build_static_assets():
+    """Fingerprints and precompresses every file under static/."""
+    for root, _dirs, files in os.walk(app.static_folder):
+        for name in files:
+            filename = os.path.relpath(os.path.join(root, name), app.static_folder).replace(os.sep, '/')
+            static_assets[filename] = _build_static_asset(filename)
+    return static_assets
+
+
+# Filled as files are first linked or requested, so a cold worker only hashes
+# what its first pages use; `flask build-static` (or `flask precompile`) fills
+# STATIC_BUILD_DIR ahead.
+static_assets = {}
+
+
+def _static_asset(filename):
+    """The built asset for a file under static/, or None if there is no such file or it cannot be read."""
+    asset = static_assets.get(filename)
+    # Under the reloader, pick up edits to static files without a restart.
+    if asset is not None and not (app.debug and os.stat(asset['path']).st_mtime != asset['mtime']):
+        return asset
+    source = safe_join(app.static_folder, filename)
+    if source is None or not os.path.isfile(source):
+        return None
+    try:
+        asset = static_assets[filename] = _build_static_asset(filename)
+    except OSError as e:
+        app.logger.warning(f"Could not fingerprint static/{filename}: {e}")
+        return None
+    return asset
+
+
+@app.template_global()
+def static_url(filename):
+    """url_for('static') with the file's content hash in the path, so it can be cached forever."""
+    asset = _static_asset(filename)
+    if asset is None:
+        return url_for('static', filename=filename)
+    return url_for('static_asset', digest=asset['digest'], filename=filename)
+
+
+def _send_static_asset(filename, immutable):
+    """Sends a static file, precompressed in the best encoding the client accepts."""
+    asset = _static_asset(filename)
+    if asset is None:
+        abort(404)
+    path, encoding = asset['path'], None
+    for candidate in ('br', 'gzip'):
+        if candidate in asset['encodings'] and candidate in request.accept_encodings:
+            path, encoding = asset['encodings'][candidate], candidate
+            break
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], conditional=True,
+                         etag=f"{asset['digest']}-{encoding or 'identity'}",
+                         max_age=STATIC_MAX_AGE if immutable else 86400)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset['encodings']:
+        response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+
+@app.route('/assets/<digest>/<path:filename>')
+def static_asset(digest, filename):
+    asset = _static_asset(filename)
+    if asset is not None and digest != asset['digest']:
+        # A page rendered before the file changed: point it at the current copy.
+        return redirect(url_for('static_asset', digest=asset['digest'], filename=filename))
+    return _send_static_asset(filename, immutable=True)
+
+
+@app.cli.command('build-static')
+def build_static_command():
+    """Precompresses static/ into STATIC_BUILD_DIR ahead of the first request."""
+    assets = build_static_assets()
+    click.echo(f"Built {len(assets)} static assets into {STATIC_BUILD_DIR}/ "
+               f"({'gzip and brotli' if _brotli() else 'gzip only'}).")
+
+
+# --- Template Cache ---
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    A bytecode cache keyed by template name alone, so the compiled templates
+    shipped in JINJA_CACHE_DIR match wherever the app is deployed. A cache
+    dir that is read-only only gets a warning, rather than failing the render.
+    """
+
+    def get_cache_key(self, name, filename=None):
+        # Jinja also hashes the template's absolute path; the source checksum already catches edits.
+        return super().get_cache_key(name)
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            app.logger.warning(f"Could not write compiled template to {JINJA_CACHE_DIR}: {e}")
+
+
+try:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(JINJA_CACHE_DIR)
+except OSError as e:
+    app.logger.warning(f"Template bytecode cache disabled: {e}")
+
+
+@app.cli.command('precompile')
+def precompile_command():
+    """
+    Writes app.py's bytecode, compiles every template into JINJA_CACHE_DIR and
+    builds static/ into STATIC_BUILD_DIR, so a fresh worker's first requests
+    compile, parse and compress nothing.
+    """
+    import py_compile
+    # Checked against the source's hash, not its mtime, which deploy tools often reset.
+    bytecode = py_compile.compile(__file__, doraise=True,
+                                  invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    assets = build_static_assets()
+    click.echo(f"Wrote {os.path.relpath(bytecode, app.root_path)}, compiled {len(names)} templates "
+               f"into {JINJA_CACHE_DIR}/ and built {len(assets)} static assets into {STATIC_BUILD_DIR}/.")
+
+
+# --- Response Compression ---
+def _response_compressor(encoding):
+    """compress(chunk), sync() and finish() callables for one response body."""
+    if encoding == 'br':
+        compressor = _brotli().Compressor(quality=5)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip framing
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compressed_stream(chunks, encoding):
+    """Compresses a streamed body chunk by chunk, flushing each so the client sees rows as they are produced."""
+    compress, sync, finish = _response_compressor(encoding)
+    for chunk in chunks:
+        yield compress(chunk) + sync()
+    yield finish()
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compresses text and JSON responses in the best encoding the client
+    accepts. Streamed bodies (the CSV exports) are compressed as they are
+    produced, once their first chunks show they will pass COMPRESS_MIN_SIZE.
+    File responses, event streams and anything already encoded pass through.
+    """
+    mimetype = response.mimetype or ''
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or request.method == 'HEAD' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or mimetype == 'text/event-stream' or not mimetype.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = next((candidate for candidate in ('br', 'gzip')
+                     if candidate in request.accept_encodings and (candidate != 'br' or _brotli())), None)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        body = response.response
+        chunks = response.iter_encoded()
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= COMPRESS_MIN_SIZE:
+                break
+        else:
+            response.set_data(b''.join(head))
+            return response
+        response.response = _compressed_stream(itertools.chain(head, chunks), encoding)
+        if hasattr(body, 'close'):
+            response.call_on_close(body.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        compress, _sync, finish = _response_compressor(encoding)
+        response.set_data(compress(data) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The compressed bytes differ from the identity body the strong ETag named.
+        response.set_etag(etag, weak=True)
+    return response
+
+
 # --- Routes ---
 
 @app.route('/favicon.ico')
 def favicon():
-    return send_from_directory(
-        os.path.join(app.root_path, 'static', 'icons'),
-        'favicon.ico',
-        mimetype='image/vnd.microsoft.icon'
-    )
+    # Pages link the fingerprinted copy; this fixed URL is only for clients that guess it,
+    # so it is cached for a day rather than marked immutable.
+    return _send_static_asset('icons/favicon.ico', immutable=False)
 
 
 @app.route('/')
@@ -282,8 +2422,10 @@ def role_required(roles):
 def student_dashboard():
     user = session['user']
     all_components = get_augmented_components()
-    all_requests = load_requests()
-    my_requests = [req for req in all_requests if req['student_email'] == user['email']]
+    my_requests = find_requests(student_email=user['email'])
+    include_archived = bool(request.args.get('archived'))
+    if include_archived:
+        my_requests = _with_archived_requests(my_requests, user['email'])
     today = datetime.date.today().strftime("%Y-%m-%d")
     max_date = (datetime.date.today() + datetime.timedelta(days=30)).strftime("%Y-%m-%d")
 
@@ -291,13 +2433,21 @@ def student_dashboard():
 
     return render_template('student_dashboard.html',
                            user=user,
-                           components=all_components,
+                           inventory_rows=render_inventory_fragment('status_rows'),
                            available_components=available_components_for_form,
                            my_requests=my_requests,
+                           include_archived=include_archived,
                            today=today,
                            max_date=max_date)
 
 
+def _with_archived_requests(live_requests, email):
+    """A user's live requests plus their archived ones, in id order."""
+    live_ids = {req['id'] for req in live_requests}
+    archived = [req for req in iter_archived_requests(student_email=email) if req['id'] not in live_ids]
+    return sorted(archived + live_requests, key=lambda req: req['id'])
+
+
 @app.route('/cancel_request/<int:request_id>', methods=['POST'])
 def cancel_request(request_id):
     if 'user' not in session:
@@ -307,48 +2457,52 @@ def cancel_request(request_id):
     user_email = session['user']['email']
     user_role = session['user']['role']
 
-    all_requests = load_requests()
-    target_request = next((req for req in all_requests if req['id'] == request_id), None)
+    with store_transaction():
+        catalog = load_catalog()
+        target_request = get_request(request_id)
 
-    if not target_request:
-        flash('Request not found.', 'error')
-        return redirect(request.referrer or url_for('home'))
+        if not target_request:
+            flash('Request not found.', 'error')
+            return redirect(request.referrer or url_for('home'))
 
-    cancel_remarks = request.form.get('cancel_remarks', '').strip()
-    if not cancel_remarks:
-        flash('Cancellation remarks are mandatory.', 'error')
-        return redirect(request.referrer or url_for('home'))
+        cancel_remarks = request.form.get('cancel_remarks', '').strip()
+        if not cancel_remarks:
+            flash('Cancellation remarks are mandatory.', 'error')
+            return redirect(request.referrer or url_for('home'))
 
-    is_owner = target_request['student_email'] == user_email
-    is_technician = user_role == 'technician'
+        is_owner = target_request['student_email'] == user_email
+        is_technician = user_role == 'technician'
 
-    if not is_owner and not is_technician:
-        flash('You are not authorized to cancel this request.', 'error')
-        return redirect(request.referrer or url_for('home'))
+        if not is_owner and not is_technician:
+            flash('You are not authorized to cancel this request.', 'error')
+            return redirect(request.referrer or url_for('home'))
 
-    cancellable_statuses = []
-    if is_owner:
-        cancellable_statuses.extend(['Pending Mentor', 'Pending Incharge', 'Approved', 'Pending Purchase'])
-    if is_technician:
-        cancellable_statuses.append('Approved')
+        cancellable_statuses = []
+        if is_owner:
+            cancellable_statuses.extend(['Pending Mentor', 'Pending Incharge', 'Approved', 'Pending Purchase'])
+        if is_technician:
+            cancellable_statuses.append('Approved')
 
-    if target_request['status'] in set(cancellable_statuses):
-        original_status = target_request['status']
-        target_request['status'] = 'Cancelled'
-        cancellation_remark = f"Cancelled by {user_role} ({user_email}): {cancel_remarks}"
+        if target_request['status'] in set(cancellable_statuses):
+            original_status = target_request['status']
+            target_request['status'] = 'Cancelled'
+            cancellation_remark = f"Cancelled by {user_role} ({user_email}): {cancel_remarks}"
 
-        # Store remark in a logical place
-        if original_status == 'Approved' and is_technician:
-            target_request['tech_remarks'] = cancellation_remark
+            # Store remark in a logical place
+            if original_status == 'Approved' and is_technician:
+                target_request['tech_remarks'] = cancellation_remark
+            else:
+                target_request['incharge_remarks'] = cancellation_remark
+
+            catalog.release(target_request)
+            if catalog.reservations_changed:
+                save_catalog(catalog)
+            save_request_records([target_request])
+            audit_event('CANCELLED', user_email, request_id=request_id, component=target_request['component_name'],
+                        before={'status': original_status}, after={'status': 'Cancelled'}, remarks=cancel_remarks)
+            flash(f'Request #{request_id} has been successfully cancelled.', 'success')
         else:
-            target_request['incharge_remarks'] = cancellation_remark
-
-        save_requests(all_requests)
-        audit_logger.info(
-            f'CANCELLED by {user_email}: Req #{request_id} (was {original_status}). Remarks: {cancel_remarks}')
-        flash(f'Request #{request_id} has been successfully cancelled.', 'success')
-    else:
-        flash(f'Request #{request_id} cannot be cancelled (Status: {target_request["status"]}).', 'error')
+            flash(f'Request #{request_id} cannot be cancelled (Status: {target_request["status"]}).', 'error')
 
     # Redirect back to the dashboard they came from
     if user_role == 'student':
@@ -366,8 +2520,7 @@ def cancel_request(request_id):
 @role_required('student')
 def request_component():
     user = session['user']
-    all_requests = load_requests()
-    all_components = get_augmented_components()
+    catalog = load_catalog()
 
     # --- NEW: Get the project type from the hidden input ---
     project_type = request.form.get('project_type')
@@ -423,7 +2576,7 @@ def request_component():
         return redirect(url_for('student_dashboard'))
 
     for comp_name, total_needed in batch_requirements.items():
-        component_obj = next((c for c in all_components if c['name'] == comp_name), None)
+        component_obj = catalog.find_by_name(comp_name)
         if not component_obj:
             flash(f"Error: Component '{comp_name}' does not exist.", 'error')
             return redirect(url_for('student_dashboard'))
@@ -435,8 +2588,9 @@ def request_component():
     # --- END: Pre-flight Validation ---
 
     # --- START: Workflow Logic based on Project Type ---
-    batch_id = f"B-{request_date_dt.strftime('%Y%m%d%H%M%S')}"
-    log_message = ""
+    # The batch id (and with it the mentor link) is assigned when the batch is saved.
+    log_action = ""
+    log_outcome = ""
 
     # Variables for the new_request object
     new_status = ""
@@ -448,7 +2602,6 @@ def request_component():
     incharge_app_time = None
     mentor_remarks = None
     incharge_remarks = None
-    batch_token = None
 
     if project_type == 'Intra-Day':
         # Auto-approve and send straight to technician
@@ -461,8 +2614,7 @@ def request_component():
         incharge_app_time = approval_time  # Bypass Incharge approval
         mentor_remarks = "Intra-Day Activity"
         incharge_remarks = "Auto-approved for Technician Issue."
-        batch_token = None  # No mentor link needed
-        log_message = f'INTRA-DAY BATCH SUBMITTED: User "{user["email"]}" batch {batch_id}. Auto-approved for Technician.'
+        log_action, log_outcome = 'INTRA-DAY BATCH SUBMITTED', '. Auto-approved for Technician.'
 
     elif project_type == 'Project Work':
         # NEW: Project Work flow (Bypass Mentor, goes to Incharge)
@@ -475,8 +2627,7 @@ def request_component():
         incharge_app_time = None  # Needs Incharge approval
         mentor_remarks = "Project Work (Mentor Bypassed)"
         incharge_remarks = None
-        batch_token = None  # No mentor link needed
-        log_message = f'PROJECT WORK BATCH SUBMITTED: User "{user["email"]}" batch {batch_id}. Awaiting Incharge.'
+        log_action, log_outcome = 'PROJECT WORK BATCH SUBMITTED', '. Awaiting Incharge.'
 
     else:  # Competition (or any other type)
         # Standard Mentor -> Incharge workflow
@@ -489,20 +2640,18 @@ def request_component():
         incharge_app_time = None
         mentor_remarks = None
         incharge_remarks = None
-        batch_token = s.dumps(batch_id)  # Needs mentor approval
-        log_message = f'REQUEST BATCH SUBMITTED: User "{user["email"]}" batch {batch_id} ({project_type}). Awaiting Mentor.'
+        log_action, log_outcome = 'REQUEST BATCH SUBMITTED', f' ({project_type}). Awaiting Mentor.'
 
     # --- END: Workflow Logic ---
 
-    current_request_id = (max(req['id'] for req in all_requests) if all_requests else 0) + 1
     new_requests_list = []
 
     for comp_name, quantity in batch_requirements.items():
-        component_obj = next((c for c in all_components if c['name'] == comp_name), None)
+        component_obj = catalog.find_by_name(comp_name)
 
         new_request = {
-            "id": current_request_id,
-            "batch_id": batch_id,
+            "id": None,  # Assigned by save_new_requests()
+            "batch_id": None,  # Assigned by save_new_requests()
             "request_type": "borrow",
             "project_type": project_type,  # --- NEW FIELD ---
             "status": new_status,
@@ -521,7 +2670,7 @@ def request_component():
             "duration_days": duration,
             "mentor_name": req_mentor_name,
             "mentor_email": req_mentor_email,
-            "mentor_approval_token": batch_token,
+            "mentor_approval_token": None,  # Assigned by save_new_requests() if a mentor must approve
             "mentor_remarks": mentor_remarks,
             "mentor_approval_timestamp": mentor_app_time,
             "hod_approval_timestamp": hod_app_time,
@@ -536,12 +2685,15 @@ def request_component():
             "purchase_link": None
         }
         new_requests_list.append(new_request)
-        current_request_id += 1
 
-    all_requests.extend(new_requests_list)
-    save_requests(all_requests)
+    # The pre-flight check above read the catalog before this transaction; reserving re-checks under the lock.
+    short = submit_borrow_requests(new_requests_list, batch_submitted_at=request_date_dt)
+    if short:
+        flash(f"Error: Insufficient stock for '{short['component_name']}'. It was just requested by someone else.",
+              'error')
+        return redirect(url_for('student_dashboard'))
 
-    app.logger.info(log_message)
+    app.logger.info(f'{log_action}: User "{user["email"]}" batch {new_requests_list[0]["batch_id"]}{log_outcome}')
     flash(f'{len(new_requests_list)} component request(s) for {project_type} have been submitted.', 'success')
     return redirect(url_for('student_dashboard'))
 
@@ -552,20 +2704,19 @@ def request_component():
 @app.route('/approve/mentor/<token>', methods=['GET', 'POST'])
 def mentor_approval(token):
     try:
-        batch_id = s.loads(token, max_age=259200)  # 72 hours
+        batch_id = s.loads(token, max_age=MENTOR_LINK_MAX_AGE)
     except SignatureExpired:
+        expire_mentor_requests()
         return render_template('mentor_response.html', title="Expired",
                                message="This approval link has expired (older than 72 hours). Please ask the student to resubmit their request."), 400
     except BadTimeSignature:
         return render_template('mentor_response.html', title="Invalid Link",
                                message="This approval link is invalid or has already been used."), 400
 
-    all_requests = load_requests()
-    batch_requests = [req for req in all_requests if
-                      req.get('batch_id') == batch_id and req['status'] == 'Pending Mentor']
+    batch_requests = find_requests(batch_id=batch_id, status='Pending Mentor')
 
     if not batch_requests:
-        already_processed = any(req.get('batch_id') == batch_id for req in all_requests)
+        already_processed = bool(find_requests(batch_id=batch_id))
         if already_processed:
             return render_template('mentor_response.html', title="Already Processed",
                                    message="This request batch has already been processed (approved, rejected, or updated)."), 400
@@ -575,20 +2726,33 @@ def mentor_approval(token):
 
     if request.method == 'POST':
         new_status = request.form.get('new_status')
+        if new_status not in ('Approved', 'Rejected'):
+            return render_template('mentor_response.html', title="Invalid Response",
+                                   message="Please choose to approve or reject the request batch."), 400
         mentor_remarks = request.form.get('mentor_remarks', '').strip()
         approval_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
-        for req in batch_requests:
-            req['mentor_approval_timestamp'] = approval_time
-            req['mentor_approval_token'] = None
-            req['mentor_remarks'] = mentor_remarks if mentor_remarks else None
-
-            if new_status == 'Approved':
-                req['status'] = 'Pending Incharge'  # Skip HOD
-            elif new_status == 'Rejected':
-                req['status'] = 'Rejected'
+        with store_transaction():
+            catalog = load_catalog()
+            # Re-read under the lock so a double-submitted form cannot act on the batch twice.
+            batch_requests = find_requests(batch_id=batch_id, status='Pending Mentor')
+            for req in batch_requests:
+                req['mentor_approval_timestamp'] = approval_time
+                req['mentor_approval_token'] = None
+                req['mentor_remarks'] = mentor_remarks if mentor_remarks else None
+
+                if new_status == 'Approved':
+                    req['status'] = 'Pending Incharge'  # Skip HOD
+                elif new_status == 'Rejected':
+                    req['status'] = 'Rejected'
+                    catalog.release(req)
+                audit_event(f'MENTOR {new_status.upper()}', req['mentor_email'], request_id=req['id'],
+                            component=req['component_name'], before={'status': 'Pending Mentor'},
+                            after={'status': req['status']}, remarks=req['mentor_remarks'])
 
-        save_requests(all_requests)
+            if catalog.reservations_changed:
+                save_catalog(catalog)
+            save_request_records(batch_requests)
 
         if new_status == 'Approved':
             return render_template('mentor_response.html', title="Approved",
@@ -610,9 +2774,11 @@ def mentor_approval(token):
 def faculty_dashboard():
     user = session['user']
     all_components = get_augmented_components()
-    all_requests = load_requests()
 
-    my_requests = [req for req in all_requests if req['student_email'] == user['email']]
+    my_requests = find_requests(student_email=user['email'])
+    include_archived = bool(request.args.get('archived'))
+    if include_archived:
+        my_requests = _with_archived_requests(my_requests, user['email'])
     my_requests.sort(key=lambda x: x['request_timestamp'], reverse=True)
 
     available_components_for_form = [c for c in all_components if c['available'] > 0]
@@ -620,9 +2786,10 @@ def faculty_dashboard():
 
     return render_template('faculty_dashboard.html',
                            user=user,
-                           components=all_components,
+                           inventory_rows=render_inventory_fragment('status_rows'),
                            available_components=available_components_for_form,
                            my_requests=my_requests,
+                           include_archived=include_archived,
                            today=today)
 
 
@@ -630,13 +2797,10 @@ def faculty_dashboard():
 @role_required('faculty')
 def faculty_request():
     user = session['user']
-    all_requests = load_requests()
-    all_components = get_augmented_components()
+    catalog = load_catalog()
     request_type = request.form.get('request_type')
 
-    batch_id = f"B-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
     request_date = datetime.datetime.now()
-    current_request_id = (max(req['id'] for req in all_requests) if all_requests else 0) + 1
     approval_time = request_date.strftime("%Y-%m-%d %H:%M")
 
     if request_type == 'borrow':
@@ -674,7 +2838,7 @@ def faculty_request():
             return redirect(url_for('faculty_dashboard'))
 
         for comp_name, total_needed in batch_requirements.items():
-            component_obj = next((c for c in all_components if c['name'] == comp_name), None)
+            component_obj = catalog.find_by_name(comp_name)
             if not component_obj:
                 flash(f"Error: Item '{comp_name}' does not exist.", 'error')
                 return redirect(url_for('faculty_dashboard'))
@@ -686,10 +2850,10 @@ def faculty_request():
 
         new_requests_list = []
         for comp_name, quantity in batch_requirements.items():
-            component_obj = next((c for c in all_components if c['name'] == comp_name), None)
+            component_obj = catalog.find_by_name(comp_name)
             new_request = {
-                "id": current_request_id,
-                "batch_id": batch_id,
+                "id": None,  # Assigned by save_new_requests()
+                "batch_id": None,  # Assigned by save_new_requests()
                 "request_type": "borrow",
                 "project_type": "Faculty Project",  # --- NEW FIELD ---
                 "status": "Pending Incharge",
@@ -723,12 +2887,15 @@ def faculty_request():
                 "purchase_link": None
             }
             new_requests_list.append(new_request)
-            current_request_id += 1
 
-        all_requests.extend(new_requests_list)
-        save_requests(all_requests)
+        short = submit_borrow_requests(new_requests_list, batch_submitted_at=request_date)
+        if short:
+            flash(f"Error: Insufficient stock for '{short['component_name']}'. It was just requested by someone else.",
+                  'error')
+            return redirect(url_for('faculty_dashboard'))
         app.logger.info(
-            f'FACULTY BORROW REQUEST: User "{user["email"]}" submitted batch {batch_id}. Bypassed to Incharge.')
+            f'FACULTY BORROW REQUEST: User "{user["email"]}" submitted batch {new_requests_list[0]["batch_id"]}. '
+            f'Bypassed to Incharge.')
         flash(f'{len(new_requests_list)} component request(s) submitted and sent to Lab Incharge.', 'success')
 
     elif request_type == 'purchase':
@@ -745,8 +2912,8 @@ def faculty_request():
             return redirect(url_for('faculty_dashboard'))
 
         new_purchase_request = {
-            "id": current_request_id,
-            "batch_id": batch_id,
+            "id": None,  # Assigned by save_new_requests()
+            "batch_id": None,  # Assigned by save_new_requests()
             "request_type": "purchase",
             "project_type": "Faculty Purchase",  # --- NEW FIELD ---
             "status": "Pending Incharge",  # MODIFIED: Was "Pending HOD", now "Pending Incharge"
@@ -781,27 +2948,47 @@ def faculty_request():
             "est_price_per_unit": purchase_price_str  # --- MODIFICATION: Save new field ---
         }
 
-        all_requests.append(new_purchase_request)
-        save_requests(all_requests)
+        save_new_requests([new_purchase_request], batch_submitted_at=request_date)
         app.logger.info(
-            f'FACULTY PURCHASE REQUEST: User "{user["email"]}" submitted batch {batch_id} for "{purchase_comp_name}". Awaiting Incharge.')
+            f'FACULTY PURCHASE REQUEST: User "{user["email"]}" submitted batch {new_purchase_request["batch_id"]} for "{purchase_comp_name}". Awaiting Incharge.')
         flash('New component purchase request submitted and sent to Incharge for approval.', 'success')
 
     return redirect(url_for('faculty_dashboard'))
 
 
 # --- HOD Routes (Unchanged) ---
+def _history_filter_args():
+    """Request history filters from the query string; a malformed date is flashed and ignored."""
+    filters = {'status': request.args.get('status') or None,
+               'project_type': request.args.get('project_type') or None,
+               'student_dept': request.args.get('dept', '').strip() or None,
+               'q': request.args.get('q', '').strip() or None}
+    for name in ('date_from', 'date_to'):
+        try:
+            filters[name] = _parse_date_arg(name)
+        except ValueError:
+            flash('Error: History dates must be in YYYY-MM-DD format.', 'error')
+            filters[name] = None
+    return filters
+
+
 @app.route('/hod_dashboard')
 @role_required('hod')
 def hod_dashboard():
-    all_requests = load_requests()
-    components = get_augmented_components()
-    other_requests = sorted(all_requests, key=lambda x: x['request_timestamp'], reverse=True)
+    history_filters = _history_filter_args()
+    include_archived = bool(request.args.get('archived'))
+    other_requests, next_cursor = page_requests(request.args.get('cursor'), include_archived=include_archived,
+                                                **history_filters)
 
     return render_template('hod_dashboard.html',
                            user=session['user'],
+                           request_statuses=REQUEST_STATUSES,
+                           project_types=PROJECT_TYPES,
+                           history_filters=history_filters,
+                           include_archived=include_archived,
+                           next_cursor=next_cursor,
                            other_requests=other_requests,
-                           components=components)
+                           inventory_rows=render_inventory_fragment('full_rows'))
 
 
 # --- Admin (Incharge) Routes ---
@@ -809,65 +2996,33 @@ def hod_dashboard():
 @app.route('/admin')
 @role_required('admin')
 def admin_dashboard():
-    all_requests = load_requests()
-    components = get_augmented_components()
-
-    # --- START: New Sorting Logic ---
-    pending_purchases = []
-    pending_faculty_borrow = []
-    pending_student_intra_day = []
-    pending_student_project = []  # Project Work + Competition
-    other_requests = []
-
-    for req in all_requests:
-        if req['status'] == 'Pending Incharge':
-            if req.get('request_type') == 'purchase':
-                pending_purchases.append(req)
-            # Check for Faculty (by dept or project type)
-            elif req.get('student_dept') == 'Faculty' or 'Faculty' in req.get('project_type', ''):
-                pending_faculty_borrow.append(req)
-            elif req.get('project_type') == 'Intra-Day':
-                pending_student_intra_day.append(req)
-            elif req.get('project_type') in ['Project Work', 'Competition']:
-                pending_student_project.append(req)
-            else:
-                # Fallback for any other pending borrow requests (e.g., old ones)
-                pending_student_project.append(req)
-        else:
-            other_requests.append(req)
-
-    # Helper function to group by batch_id
-    def group_by_batch(request_list):
-        grouped = {}
-        for req in request_list:
-            # Use batch_id if available, otherwise group individual reqs
-            batch_id = req.get('batch_id', f"req-{req['id']}")
-            if batch_id not in grouped:
-                grouped[batch_id] = []
-            grouped[batch_id].append(req)
-        return grouped
-
-    # Group all the new lists
-    grouped_faculty_borrow = group_by_batch(pending_faculty_borrow)
-    grouped_student_intra_day = group_by_batch(pending_student_intra_day)
-    grouped_student_project = group_by_batch(pending_student_project)
-    # --- END: New Sorting Logic ---
-
-    other_requests.sort(key=lambda x: x['request_timestamp'], reverse=True)
+    expire_mentor_requests()
+    incharge_queue = load_incharge_queue()
+    history_filters = _history_filter_args()
+    include_archived = bool(request.args.get('archived'))
+    other_requests, next_cursor = page_requests(request.args.get('cursor'), include_archived=include_archived,
+                                                exclude_statuses=['Pending Incharge'], **history_filters)
+
+    pending_purchases = [req for batch in incharge_queue['purchase'].values() for req in batch]
     pending_purchases.sort(key=lambda x: x['request_timestamp'],
                            reverse=True)  # Keep this one as a list, its table is simple
 
     return render_template('admin_dashboard.html',
                            user=session['user'],
+                           request_statuses=REQUEST_STATUSES,
+                           project_types=PROJECT_TYPES,
 
                            # NEW: Pass the 4 categories
                            pending_purchases=pending_purchases,  # This is a list
-                           grouped_faculty_borrow=grouped_faculty_borrow,  # This is a dict
-                           grouped_student_intra_day=grouped_student_intra_day,  # This is a dict
-                           grouped_student_project=grouped_student_project,  # This is a dict
+                           grouped_faculty_borrow=incharge_queue['faculty'],  # This is a dict
+                           grouped_student_intra_day=incharge_queue['intra_day'],  # This is a dict
+                           grouped_student_project=incharge_queue['project'],  # This is a dict
 
+                           history_filters=history_filters,
+                           include_archived=include_archived,
+                           next_cursor=next_cursor,
                            other_requests=other_requests,
-                           components=components)
+                           inventory_rows=render_inventory_fragment('full_rows'))
 
 
 # --- END: MODIFIED ADMIN DASHBOARD ROUTE ---
@@ -881,58 +3036,71 @@ def admin_update_request():
     admin_user = session['user']
     incharge_remarks = request.form.get('incharge_remarks', '').strip()
 
-    all_requests = load_requests()
-    all_components = get_augmented_components()
+    with store_transaction():
+        catalog = load_catalog()
 
-    if not batch_id:
-        flash('Error: No Batch ID provided.', 'error')
-        return redirect(url_for('admin_dashboard'))
+        if not batch_id:
+            flash('Error: No Batch ID provided.', 'error')
+            return redirect(url_for('admin_dashboard'))
 
-    if batch_id.startswith('req-'):
-        req_id = int(batch_id.split('-')[1])
-        batch_requests = [req for req in all_requests if req['id'] == req_id and req['status'] == 'Pending Incharge']
-    else:
-        batch_requests = [req for req in all_requests if
-                          req.get('batch_id') == batch_id and req['status'] == 'Pending Incharge']
+        if batch_id.startswith('req-'):
+            req_id = int(batch_id.split('-')[1])
+            target_request = get_request(req_id)
+            batch_requests = [target_request] if target_request and target_request['status'] == 'Pending Incharge' else []
+        else:
+            batch_requests = find_requests(batch_id=batch_id, status='Pending Incharge')
 
-    if not batch_requests:
-        flash('Error: Request batch not found or already processed.', 'error')
-        return redirect(url_for('admin_dashboard'))
+        if not batch_requests:
+            flash('Error: Request batch not found or already processed.', 'error')
+            return redirect(url_for('admin_dashboard'))
 
-    approval_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-    approved_count = 0
-    rejected_count = 0
+        approval_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        approved_count = 0
+        rejected_count = 0
 
-    for req in batch_requests:
-        req['approval_timestamp'] = approval_time
-        req['approver_email'] = admin_user['email']
+        for req in batch_requests:
+            req['approval_timestamp'] = approval_time
+            req['approver_email'] = admin_user['email']
 
-        if new_status == 'Approved':
-            target_component = next((comp for comp in all_components if comp['name'] == req['component_name']), None)
-            if target_component:
-                available_stock = target_component['available']
-                if available_stock >= req['quantity']:
-                    req['status'] = 'Approved'
-                    req['incharge_remarks'] = incharge_remarks if incharge_remarks else "Approved."
-                    approved_count += 1
-                    audit_logger.info(
-                        f'APPROVAL by {admin_user["email"]}: Req #{req["id"]}. Item {req["component_name"]} approved for issue.')
+            if new_status == 'Approved':
+                target_component = catalog.find_by_name(req['component_name'])
+                if target_component:
+                    # Requests hold their stock from submission; older ones without a reservation take it now.
+                    # Either way 'available' is updated as each item in the batch is approved.
+                    available_stock = target_component['available']
+                    if catalog.reserve(req):
+                        req['status'] = 'Approved'
+                        req['incharge_remarks'] = incharge_remarks if incharge_remarks else "Approved."
+                        approved_count += 1
+                        audit_event('APPROVAL', admin_user['email'], request_id=req['id'],
+                                    component=req['component_name'], remarks=req['incharge_remarks'])
+                    else:
+                        req['status'] = 'Rejected'
+                        catalog.release(req)
+                        rejection_note = f"Auto-rejected: Insufficient stock (Only {available_stock} available.)"
+                        req['incharge_remarks'] = f"{rejection_note} {incharge_remarks}".strip()
+                        rejected_count += 1
+                        audit_event('REJECTION', admin_user['email'], request_id=req['id'],
+                                    component=req['component_name'], remarks=req['incharge_remarks'])
                 else:
                     req['status'] = 'Rejected'
-                    rejection_note = f"Auto-rejected: Insufficient stock (Only {available_stock} available.)"
-                    req['incharge_remarks'] = f"{rejection_note} {incharge_remarks}".strip()
+                    req['stock_reserved'] = False
+                    req['incharge_remarks'] = f"Auto-rejected: Component not found in database. {incharge_remarks}".strip()
                     rejected_count += 1
-            else:
+                    audit_event('REJECTION', admin_user['email'], request_id=req['id'],
+                                component=req['component_name'], remarks=req['incharge_remarks'])
+
+            elif new_status == 'Rejected':
                 req['status'] = 'Rejected'
-                req['incharge_remarks'] = f"Auto-rejected: Component not found in database. {incharge_remarks}".strip()
+                catalog.release(req)
+                req['incharge_remarks'] = incharge_remarks if incharge_remarks else "Manually Rejected."
                 rejected_count += 1
+                audit_event('REJECTION', admin_user['email'], request_id=req['id'],
+                            component=req['component_name'], remarks=req['incharge_remarks'])
 
-        elif new_status == 'Rejected':
-            req['status'] = 'Rejected'
-            req['incharge_remarks'] = incharge_remarks if incharge_remarks else "Manually Rejected."
-            rejected_count += 1
-
-    save_requests(all_requests)
+        if catalog.reservations_changed:
+            save_catalog(catalog)
+        save_request_records(batch_requests)
 
     if approved_count > 0 and rejected_count > 0:
         flash(
@@ -954,165 +3122,424 @@ def admin_update_purchase_request():
     incharge_remarks = request.form.get('incharge_remarks', '').strip()
     admin_user = session['user']
 
-    all_requests = load_requests()
-    target_request = next(
-        (req for req in all_requests if req['id'] == request_id and req['status'] == 'Pending Incharge'), None)
-
-    if not target_request:
-        flash('Error: Purchase request not found or already processed.', 'error')
-        return redirect(url_for('admin_dashboard'))
+    with store_transaction():
+        target_request = get_request(request_id)
 
-    approval_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-    target_request['approval_timestamp'] = approval_time
-    target_request['approver_email'] = admin_user['email']
-    target_request['incharge_remarks'] = incharge_remarks if incharge_remarks else None
+        if not target_request or target_request['status'] != 'Pending Incharge':
+            flash('Error: Purchase request not found or already processed.', 'error')
+            return redirect(url_for('admin_dashboard'))
 
-    if new_status == 'Purchased':
-        target_request['status'] = 'Purchased'
-        flash(f'Purchase request #{request_id} marked as PURCHASED.', 'success')
-        audit_logger.info(
-            f'PURCHASE by {admin_user["email"]}: Req #{request_id} ({target_request["component_name"]}) marked as Purchased.')
-    else:
-        target_request['status'] = 'Rejected'
-        flash(f'Purchase request #{request_id} rejected by Incharge.', 'success')
+        approval_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        target_request['approval_timestamp'] = approval_time
+        target_request['approver_email'] = admin_user['email']
+        target_request['incharge_remarks'] = incharge_remarks if incharge_remarks else None
+
+        if new_status == 'Purchased':
+            target_request['status'] = 'Purchased'
+            flash(f'Purchase request #{request_id} marked as PURCHASED.', 'success')
+            audit_event('PURCHASE', admin_user['email'], request_id=request_id,
+                        component=target_request['component_name'], remarks=target_request['incharge_remarks'])
+        else:
+            target_request['status'] = 'Rejected'
+            flash(f'Purchase request #{request_id} rejected by Incharge.', 'success')
+            audit_event('REJECTION', admin_user['email'], request_id=request_id,
+                        component=target_request['component_name'], remarks=target_request['incharge_remarks'])
 
-    save_requests(all_requests)
+        save_request_records([target_request])
     return redirect(url_for('admin_dashboard'))
 
 
+# --- Report Export ---
+REPORT_HEADERS = [
+    'Request ID', 'Batch ID', 'Request Type', 'Project Type', 'Student ID', 'Student name', 'Department',
+    'Year of study',
+    'Component ID', 'Component Name', 'Quantity', 'Purpose', 'Purchase Link', 'Duration (Days)', 'Status',
+    'Mentor Name', 'Mentor Approval', 'Mentor Remarks',
+    'ChairPerson Approval', 'ChairPerson Remarks',
+    'Incharge Approval', 'Incharge Remarks',
+    'Component Issue Time', 'Due date', 'Date of return',
+    'Working Returned', 'Not Working Returned', 'Technician Remarks', 'Drawer Number'
+]
+
+
+def report_row(req):
+    return [
+        req.get('id', 'N/A'), req.get('batch_id', 'N/A'), req.get('request_type', 'borrow'),
+        req.get('project_type', 'N/A'),
+        req.get('student_email', 'N/A'),
+        req.get('student_name', 'N/A'), req.get('student_dept', 'N/A'),
+        req.get('student_year', 'N/A'), req.get('component_id', 'N/A'),
+        req.get('component_name', 'N/A'), req.get('quantity', 'N/A'),
+        req.get('project_description', 'N/A'),
+        req.get('purchase_link', 'N/A'),
+        req.get('duration_days', 'N/A'), req.get('status', 'N/A'),
+        req.get('mentor_name', 'N/A'),
+        req.get('mentor_approval_timestamp', 'N/A'),
+        req.get('mentor_remarks', 'N/A'),
+        req.get('hod_approval_timestamp', 'N/A'),
+        req.get('hod_remarks', 'N/A'),
+        req.get('approver_email', 'N/A'),
+        req.get('incharge_remarks', 'N/A'),
+        req.get('issue_timestamp', 'N/A'),
+        req.get('due_date', 'N/A'), req.get('actual_return_timestamp', 'N/A'),
+        req.get('working_count', 'N/A'),
+        req.get('not_working_count', 'N/A'),
+        req.get('tech_remarks', 'N/A'),
+        req.get('drawer_number', 'N/A')
+    ]
+
+
+def stream_csv(headers, rows):
+    """Yields CSV text in chunks of EXPORT_CHUNK_ROWS rows as `rows` is consumed."""
+    import csv  # Only exports and imports need these; keep them off the startup path.
+    import io
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _parse_date_arg(name):
+    """Returns a 'YYYY-MM-DD' query argument, None if absent; raises ValueError if malformed."""
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
 @app.route('/admin/download_report')
 @role_required(['admin', 'hod'])
 def admin_download_report():
-    all_requests = load_requests()
-    if not all_requests:
+    dashboard = 'hod_dashboard' if session['user']['role'] == 'hod' else 'admin_dashboard'
+    try:
+        date_from = _parse_date_arg('date_from')
+        date_to = _parse_date_arg('date_to')
+    except ValueError:
+        flash('Error: Report dates must be in YYYY-MM-DD format.', 'error')
+        return redirect(url_for(dashboard))
+
+    rows = iter_requests(status=request.args.get('status') or None,
+                         project_type=request.args.get('project_type') or None,
+                         date_from=date_from, date_to=date_to, include_archived=True)
+    first = next(rows, None)
+    if first is None:
         flash('No requests to download.', 'error')
-        return redirect(url_for('admin_dashboard'))
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # --- ADDED 'Project Type' to headers ---
-    headers = [
-        'Request ID', 'Batch ID', 'Request Type', 'Project Type', 'Student ID', 'Student name', 'Department',
-        'Year of study',
-        'Component ID', 'Component Name', 'Quantity', 'Purpose', 'Purchase Link', 'Duration (Days)', 'Status',
-        'Mentor Name', 'Mentor Approval', 'Mentor Remarks',
-        'ChairPerson Approval', 'ChairPerson Remarks',
-        'Incharge Approval', 'Incharge Remarks',
-        'Component Issue Time', 'Due date', 'Date of return',
-        'Working Returned', 'Not Working Returned', 'Technician Remarks', 'Drawer Number'
-    ]
-    writer.writerow(headers)
-    for req in all_requests:
-        writer.writerow([
-            req.get('id', 'N/A'), req.get('batch_id', 'N/A'), req.get('request_type', 'borrow'),
-            req.get('project_type', 'N/A'),  # --- ADDED 'project_type' field ---
-            req.get('student_email', 'N/A'),
-            req.get('student_name', 'N/A'), req.get('student_dept', 'N/A'),
-            req.get('student_year', 'N/A'), req.get('component_id', 'N/A'),
-            req.get('component_name', 'N/A'), req.get('quantity', 'N/A'),
-            req.get('project_description', 'N/A'),
-            req.get('purchase_link', 'N/A'),
-            req.get('duration_days', 'N/A'), req.get('status', 'N/A'),
-            req.get('mentor_name', 'N/A'),
-            req.get('mentor_approval_timestamp', 'N/A'),
-            req.get('mentor_remarks', 'N/A'),
-            req.get('hod_approval_timestamp', 'N/A'),
-            req.get('hod_remarks', 'N/A'),
-            req.get('approver_email', 'N/A'),
-            req.get('incharge_remarks', 'N/A'),
-            req.get('issue_timestamp', 'N/A'),
-            req.get('due_date', 'N/A'), req.get('actual_return_timestamp', 'N/A'),
-            req.get('working_count', 'N/A'),
-            req.get('not_working_count', 'N/A'),
-            req.get('tech_remarks', 'N/A'),
-            req.get('drawer_number', 'N/A')  # --- NEW FIELD ---
-        ])
-
-    output.seek(0)
+        return redirect(url_for(dashboard))
+
     return Response(
-        output, mimetype="text/csv",
+        stream_csv(REPORT_HEADERS, (report_row(req) for req in itertools.chain([first], rows))),
+        mimetype="text/csv",
         headers={"Content-Disposition": "attachment;filename=RACE_Lab_Full_Report.csv"}
     )
 
 
-@app.route('/admin/download_audit_log')
+# --- Audit Log Export & Query ---
+AUDIT_EXPORT_HEADERS = ['Time (IST)', 'Action', 'Performed By', 'Req ID', 'Item', 'Details']
+
+
+@lru_cache(maxsize=1)
+def _legacy_audit_patterns():
+    """
+    Patterns for free-text lines from before audit events were structured:
+    "<ACTION> by <email>: <details>" (or "<ACTION> (<note>): Tech <email> <details>"
+    for a collection whose component was missing), and the ways <details> named the item.
+    """
+    import re
+    return ((
+        re.compile(r'(?P<action>[A-Z][A-Z ]*?) by (?P<actor>[^:]+): (?P<details>.*)'),
+        re.compile(r'(?P<action>[A-Z][A-Z ]*? \([^)]*\)): Tech (?P<actor>\S+) (?P<details>.*)'),
+    ), (
+        re.compile(r'Req #(?P<request_id>\d+)\. (?:Item|Stock) (?P<component>.+?)'
+                   r'(?: approved for issue| issued|\.| \d+ -> \d+)'),
+        re.compile(r'Req #(?P<request_id>\d+) \((?P<component>[^)]*)\) marked as Purchased'),
+        re.compile(r'Req #(?P<request_id>\d+) but component "(?P<component>[^"]*)" not in DB'),
+        re.compile(r'"(?P<component>[^"]*)"'),
+        re.compile(r'Req #(?P<request_id>\d+)'),
+    ))
+
+
+def decode_legacy_audit_line(line):
+    """Reads the action, actor, request id and item out of a pre-JSON audit.log line."""
+    timestamp, _, message = line.partition(' - ')
+    event = {'ts': timestamp, 'action': 'UNKNOWN', 'actor': None, 'request_id': None, 'component': None,
+             'before': None, 'after': None, 'remarks': message}
+    headers, detail_patterns = _legacy_audit_patterns()
+    match = next(filter(None, (header.match(message) for header in headers)), None)
+    if not match:
+        return event
+    event.update(action=match['action'], actor=match['actor'], remarks=match['details'])
+    for pattern in detail_patterns:
+        found = pattern.search(match['details'])
+        if found:
+            fields = found.groupdict()
+            if fields.get('request_id'):
+                event['request_id'] = int(fields['request_id'])
+            event['component'] = fields.get('component')
+            break
+    return event
+
+
+def decode_audit_line(line):
+    """Returns the event stored on one audit.log line, or None for a blank line."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return decode_legacy_audit_line(line)
+
+
+def audit_export_row(event):
+    before, after = event.get('before') or {}, event.get('after') or {}
+    changes = [f"{field.replace('_quantity', '').replace('_', ' ').title()}: {before.get(field, '-')} -> {after.get(field, '-')}"
+               for field in dict.fromkeys([*before, *after])]
+    details = '. '.join(changes + ([event['remarks']] if event.get('remarks') else []) +
+                        [f"#{item['request_id']} {item['component']}: {item['remarks']}" for item in event.get('items', [])])
+    return [event.get('ts'), event.get('action'), event.get('actor') or 'N/A', event.get('request_id') or 'N/A',
+            event.get('component') or 'N/A', details or 'N/A']
+
+
+def sealed_audit_segments():
+    """Rotated audit.log segments, oldest first. The caller holds AUDIT_EXPORT_LOCK_FILE."""
+    return sorted(glob.glob(glob.escape(AUDIT_LOG) + '.*.gz'))
+
+
+def _audit_log_stat():
+    """(inode, size) of the live audit.log; a log rotated but not yet written to counts as empty."""
+    try:
+        log_stat = os.stat(AUDIT_LOG)
+    except FileNotFoundError:
+        return None, 0
+    return log_stat.st_ino, log_stat.st_size
+
+
+def _read_audit_segment(path):
+    with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            event = decode_audit_line(line)
+            if event:
+                yield event
+
+
+def refresh_audit_export_cache():
+    """
+    Appends export rows for audit events written since the last refresh to
+    AUDIT_EXPORT_CACHE. Rows from sealed segments are kept; after a rotation
+    only the rows of the live audit.log are rebuilt.
+    """
+    import csv
+    with _exclusive_lock(AUDIT_EXPORT_LOCK_FILE):
+        segments = sealed_audit_segments()
+        inode, size = _audit_log_stat()
+        if inode is None and not segments:
+            raise FileNotFoundError(AUDIT_LOG)
+
+        state = _read_json_cached(AUDIT_EXPORT_STATE) or {}
+        if not os.path.exists(AUDIT_EXPORT_CACHE) or 'segments' not in state or \
+                segments[:len(state['segments'])] != state['segments']:
+            state = {'segments': [], 'sealed_size': 0, 'inode': None, 'offset': 0, 'cache_size': 0}
+        new_segments = segments[len(state['segments']):]
+        if new_segments or state['inode'] != inode or size < state['offset']:
+            state = dict(state, inode=inode, offset=0, cache_size=state['sealed_size'])
+        if not new_segments and size == state['offset']:
+            return
+
+        chunk = b''
+        if size:
+            with open(AUDIT_LOG, 'rb') as f:
+                f.seek(state['offset'])
+                chunk = f.read(size - state['offset'])
+        # A line still being written is left for the next refresh.
+        complete = chunk.rfind(b'\n') + 1
+        events = (decode_audit_line(line) for line in chunk[:complete].decode('utf-8', 'replace').splitlines())
+
+        with open(AUDIT_EXPORT_CACHE, 'a+', newline='') as cache:
+            # Drop rows from a refresh that died before it could record its progress.
+            cache.truncate(state['cache_size'])
+            cache.seek(state['cache_size'])
+            writer = csv.writer(cache)
+            for segment in new_segments:
+                writer.writerows(audit_export_row(event) for event in _read_audit_segment(segment))
+            sealed_size = cache.tell() if new_segments else state['sealed_size']
+            writer.writerows(audit_export_row(event) for event in events if event)
+            cache_size = cache.tell()
+
+        _write_json_cached(AUDIT_EXPORT_STATE, {
+            'segments': segments, 'sealed_size': sealed_size,
+            'inode': inode, 'offset': state['offset'] + complete, 'cache_size': cache_size})
+
+
+def _stream_audit_export():
+    import csv
+    import io
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(AUDIT_EXPORT_HEADERS)
+    yield buffer.getvalue()
+    with open(AUDIT_EXPORT_CACHE, 'r', newline='') as cache:
+        while True:
+            block = cache.read(64 * 1024)
+            if not block:
+                break
+            yield block
+
+
+def refresh_audit_index():
+    """
+    Brings the audit index up to date and returns it: the first timestamp of
+    each sealed segment (None for an empty one), plus a sparse timestamp ->
+    byte offset list over the live audit.log. The caller holds
+    AUDIT_EXPORT_LOCK_FILE.
+    """
+    segments = sealed_audit_segments()
+    inode, size = _audit_log_stat()
+    index = _read_json_cached(AUDIT_INDEX) or {}
+    known = [path for path, _ in index.get('segments', [])]
+    if segments[:len(known)] != known:
+        index, known = {}, []
+    if not index or index['inode'] != inode or size < index['offset']:
+        index = {'segments': index.get('segments', []), 'inode': inode, 'offset': 0, 'lines': 0, 'marks': []}
+    if segments == known and size == index['offset']:
+        return index
+
+    index = dict(index, segments=list(index['segments']), marks=list(index['marks']))
+    for path in segments[len(known):]:
+        first = next(_read_audit_segment(path), None)
+        # Empty segments are listed too, so entries stay aligned with sealed_audit_segments().
+        index['segments'].append([path, first['ts'] if first else None])
+    if size:
+        with open(AUDIT_LOG, 'rb') as f:
+            f.seek(index['offset'])
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # Still being written.
+                if index['lines'] % AUDIT_INDEX_STRIDE == 0:
+                    event = decode_audit_line(raw.decode('utf-8', 'replace'))
+                    if event:
+                        index['marks'].append([event['ts'], index['offset']])
+                index['offset'] += len(raw)
+                index['lines'] += 1
+    _write_json_cached(AUDIT_INDEX, index)
+    return index
+
+
+def _read_audit_events_from(path, offset):
+    """Events from `path` onwards: the rest of that file, later segments, then the live audit.log."""
+    segments = sealed_audit_segments()
+    for segment in segments[segments.index(path):] if path in segments else []:
+        yield from _read_audit_segment(segment)
+    try:
+        with open(AUDIT_LOG, 'rb') as f:
+            f.seek(offset if path == AUDIT_LOG else 0)
+            for raw in f:
+                event = decode_audit_line(raw.decode('utf-8', 'replace'))
+                if event:
+                    yield event
+    except FileNotFoundError:
+        pass
+
+
+def _audit_event_mentions(event, field, value):
+    """Whether the event, or one of a grouped event's items, has `field` equal to `value`."""
+    return event.get(field) == value or any(item.get(field) == value for item in event.get('items', []))
+
+
+def query_audit_events(since=None, until=None, actor=None, request_id=None, component=None,
+                       limit=AUDIT_QUERY_LIMIT):
+    """
+    Events matching every given filter, oldest first. `since`/`until` are
+    timestamp prefixes ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'); the read starts
+    at the last segment or indexed offset before `since` and stops once past
+    `until`.
+    """
+    if until and len(until) < 23:
+        until = until + '\uffff'  # Include every timestamp that merely starts with `until`.
+
+    events = []
+    with _exclusive_lock(AUDIT_EXPORT_LOCK_FILE):
+        index = refresh_audit_index()
+        marks = [[ts, path, 0] for path, ts in index['segments'] if ts] + \
+                [[ts, AUDIT_LOG, offset] for ts, offset in index['marks']]
+        if not marks:
+            return events
+        position = bisect.bisect_left([mark[0] for mark in marks], since) if since else 0
+        _, path, offset = marks[max(position - 1, 0)]
+
+        for event in _read_audit_events_from(path, offset):
+            if until and event['ts'] > until:
+                break
+            if since and event['ts'] < since:
+                continue
+            if actor and event.get('actor') != actor:
+                continue
+            if request_id is not None and not _audit_event_mentions(event, 'request_id', request_id):
+                continue
+            if component and not _audit_event_mentions(event, 'component', component):
+                continue
+            events.append(event)
+            if len(events) >= limit:
+                break
+    return events
+
+
+@app.route('/admin/audit')
 @role_required(['admin', 'hod'])
-def admin_download_audit_log():
-    approval_pattern = re.compile(r"APPROVAL by (.*?): Req #(\d+). Item (.*?) approved for issue.")
-    issue_pattern = re.compile(
-        r"ISSUE by (.*?): Req #(\d+). Stock (.*?) issued (\d+) -> (\d+). Drawer: (.*)")  # --- MODIFIED ---
-    collection_pattern = re.compile(r"COLLECTION by (.*?): Req #(\d+). (\d+) working, (\d+) not working.")
-    manual_pattern = re.compile(r'MANUAL UPDATE by (.*?): "(.*?)".*?Total: (\d+)->(\d+), Working: (\d+)->(\d+)')
-    new_comp_pattern = re.compile(r'NEW COMPONENT by (.*?): "(.*?)".*?Total: (\d+), Working: (\d+)')
-    purchase_pattern = re.compile(r'PURCHASE by (.*?): Req #(\d+) \((.*?)\) marked as Purchased.')
-    cancel_pattern = re.compile(r'CANCELLED by (.*?): Req #(\d+)')  # Added cancel
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    headers = ['Time (IST)', 'Action', 'Performed By', 'Req ID', 'Item', 'Details']
-    writer.writerow(headers)
+def admin_audit_query():
+    """JSON audit query: ?since=&until=&actor=&request_id=&component=&limit="""
+    try:
+        request_id = request.args.get('request_id', type=int)
+        limit = min(request.args.get('limit', AUDIT_QUERY_LIMIT, type=int), AUDIT_QUERY_LIMIT)
+        events = query_audit_events(since=request.args.get('since') or None,
+                                    until=request.args.get('until') or None,
+                                    actor=request.args.get('actor') or None,
+                                    request_id=request_id,
+                                    component=request.args.get('component') or None,
+                                    limit=limit)
+    except FileNotFoundError:
+        events = []
+    return jsonify(events=events, count=len(events))
+
 
+@app.route('/admin/state_at')
+@role_required(['admin', 'hod'])
+def admin_state_at():
+    """JSON point-in-time view from the event log: ?at=&request_id=&component="""
+    if not isinstance(storage, EventBackend):
+        return jsonify(error="Point-in-time state needs RACELAB_STORAGE=events."), 404
+    at = request.args.get('at', '').strip()
+    if not at:
+        return jsonify(error="Give a timestamp as ?at=YYYY-MM-DD[ HH:MM[:SS]]."), 400
     try:
-        with open('audit.log', 'r') as f:
-            for line in f:
-                try:
-                    timestamp, message = line.strip().split(' - ', 1)
-                except ValueError:
-                    continue
+        with _shared_lock(STORE_LOCK_FILE):
+            index, components, seq = reconstruct_state(at)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    request_id = request.args.get('request_id', type=int)
+    component = request.args.get('component')
+    requests_ = [index.get(request_id)] if request_id is not None else index.records()
+    requests_ = [req for req in requests_ if req and (not component or req.get('component_name') == component)]
+    components = [comp for comp in components.values()
+                  if not component or component in (comp['id'], comp['name'])]
+    return jsonify(at=at, seq=seq, requests=requests_, components=components)
 
-                action, performed_by, req_id, item, details = ('UNKNOWN', 'N/A', 'N/A', 'N/A', 'N/A')
-
-                match_approval = approval_pattern.search(message)
-                match_issue = issue_pattern.search(message)
-                match_collection = collection_pattern.search(message)
-                match_manual = manual_pattern.search(message)
-                match_new_comp = new_comp_pattern.search(message)
-                match_purchase = purchase_pattern.search(message)
-                match_cancel = cancel_pattern.search(message)  # Added cancel
-
-                if match_approval:
-                    action = 'APPROVAL (INCHARGE)'
-                    performed_by, req_id, item = match_approval.groups()
-                    details = "Approved for issue"
-                elif match_issue:  # --- MODIFIED ---
-                    action = 'ISSUE (TECHNICIAN)'
-                    performed_by, req_id, item, qty_from, qty_to, drawer = match_issue.groups()
-                    details = f"Issued quantity {qty_from} -> {qty_to}. Drawer: {drawer}"
-                elif match_collection:
-                    action = 'COLLECTION (RETURN)'
-                    performed_by, req_id, working, not_working = match_collection.groups()
-                    item = "N/A (See Req ID)"
-                    details = f"{working} working, {not_working} not working"
-                elif match_manual:
-                    action = 'MANUAL UPDATE'
-                    performed_by, item, t_from, t_to, w_from, w_to = match_manual.groups()
-                    req_id = 'N/A'
-                    details = f"Total: {t_from}->{t_to}, Working: {w_from}->{w_to}"
-                elif match_new_comp:
-                    action = 'NEW COMPONENT'
-                    performed_by, item, total, working = match_new_comp.groups()
-                    req_id = 'N/A'
-                    details = f"Added with Total: {total}, Working: {working}"
-                elif match_purchase:
-                    action = 'PURCHASE'
-                    performed_by, req_id, item = match_purchase.groups()
-                    details = "Purchase request marked as complete."
-                elif match_cancel:  # Added cancel
-                    action = 'CANCELLED'
-                    performed_by, req_id = match_cancel.groups()
-                    item = "N/A (See Req ID)"
-                    details = f"Request cancelled. {message.split('Remarks: ')[-1]}"
-                else:
-                    details = message
 
-                writer.writerow([timestamp, action, performed_by, req_id, item, details])
+@app.route('/admin/download_audit_log')
+@role_required(['admin', 'hod'])
+def admin_download_audit_log():
+    try:
+        refresh_audit_export_cache()
     except FileNotFoundError:
         flash('The audit log file was not found.', 'error')
         return redirect(url_for('admin_dashboard'))
 
-    output.seek(0)
     return Response(
-        output,
+        _stream_audit_export(),
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment;filename=RACE_Lab_Audit_Log.csv"}
     )
@@ -1122,14 +3549,113 @@ def admin_download_audit_log():
 @app.route('/tech')
 @role_required('technician')
 def tech_dashboard():
-    all_requests = load_requests()
-    components = get_augmented_components()
-    approved_requests = [req for req in all_requests if req['status'] == 'Approved']
-    dispatched_requests = [req for req in all_requests if req['status'] == 'ISSUED']
+    approved_requests = find_requests(status='Approved')
+    dispatched_requests = find_requests(status='ISSUED')
     return render_template('tech_dashboard.html', user=session['user'],
                            approved_requests=approved_requests,
                            dispatched_requests=dispatched_requests,
-                           components=components)
+                           inventory_rows=render_inventory_fragment('full_rows'),
+                           inventory_options=render_inventory_fragment('update_options'))
+
+
+def _sse(event_type, event_id, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _tech_stream_messages(event):
+    """SSE messages for one commit event, each carrying the tech_dashboard row it changes."""
+    if event.get('resync'):
+        yield _sse('resync', event['version'], {})
+        return
+    queue_rows = {'Approved': ('approved', get_template_attribute('tech_rows.html', 'approved_row')),
+                  'ISSUED': ('issued', get_template_attribute('tech_rows.html', 'dispatched_row'))}
+    for req in event['requests']:
+        queue_name, row = queue_rows.get(req.get('status'), (None, None))
+        yield _sse('request', event['version'],
+                   {'id': req['id'], 'queue': queue_name, 'html': str(row(req)) if row else ''})
+    component_row = get_template_attribute('tech_rows.html', 'component_row')
+    for comp in ComponentCatalog(_copy_records(event['components'])).components:
+        yield _sse('stock', event['version'], {'id': comp['id'], 'html': str(component_row(comp))})
+
+
+@app.route('/tech/stream')
+@role_required('technician')
+def tech_stream():
+    """Server-Sent Events: request state and stock changes for tech_dashboard, as they are committed."""
+    subscription = event_bus.subscribe()
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield from _tech_stream_messages(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def _issue_request(catalog, target_request, drawer_number):
+    """
+    Marks one Approved request ISSUED and moves its quantity into the
+    component's issued count. Returns the component, or an error message
+    string if the request cannot be issued; nothing is changed then.
+    """
+    if not target_request or target_request['status'] != 'Approved':
+        return 'Not found or not in "Approved" state.'
+    target_component = catalog.find_by_name(target_request['component_name'])
+    if not target_component:
+        return f'Component "{target_request["component_name"]}" not found in database.'
+
+    # Stock set aside for this request counts towards it; other requests' reservations do not.
+    available_stock = catalog.issuable(target_request)
+    if available_stock < target_request['quantity']:
+        return f'Insufficient stock for "{target_component["name"]}". Only {available_stock} available.'
+
+    catalog.issue(target_request)
+    target_request['status'] = 'ISSUED'
+    target_request['issue_timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    if target_request.get('project_type') == 'Project Work' and drawer_number:
+        target_request['drawer_number'] = drawer_number
+    return target_component
+
+
+def issue_requests(items, tech_user_email):
+    """
+    Issues each (request_id, drawer_number) in `items`, in order, in one
+    transaction: stock is checked against one catalog load, so earlier items
+    claim it first, and the catalog and requests are saved once. Returns
+    (request_id, error) pairs, error being None for items issued.
+    """
+    results, issued, audits = [], [], []
+    with store_transaction():
+        catalog = load_catalog()
+        for request_id, drawer_number in dict(items).items():
+            target_request = get_request(request_id)
+            component = _issue_request(catalog, target_request, drawer_number)
+            if isinstance(component, str):
+                results.append((request_id, component))
+                continue
+            issued.append(target_request)
+            audits.append((request_id, component['name'], component['issued_quantity'] - target_request['quantity'],
+                           component['issued_quantity'], drawer_number))
+            results.append((request_id, None))
+        if issued:
+            save_catalog(catalog)
+            save_request_records(issued)
+
+    for request_id, component_name, old_issued, new_issued, drawer_number in audits:
+        app.logger.info(f'ITEM ISSUED: Tech "{tech_user_email}" ISSUED req #{request_id}')
+        audit_event('ISSUE', tech_user_email, request_id=request_id, component=component_name,
+                    before={'issued_quantity': old_issued}, after={'issued_quantity': new_issued},
+                    remarks=f"Drawer: {drawer_number or 'N/A'}")
+    return results
 
 
 @app.route('/tech/dispatch', methods=['POST'])
@@ -1137,115 +3663,130 @@ def tech_dashboard():
 def tech_dispatch_item():
     request_id = int(request.form.get('request_id'))
     drawer_number = request.form.get('drawer_number')  # --- NEW FIELD ---
-    all_requests = load_requests()
-    all_components = load_components()
-    tech_user_email = session["user"]["email"]
+    [(request_id, error)] = issue_requests([(request_id, drawer_number)], session["user"]["email"])
+    if error:
+        flash(f'Error: Could not Issue request #{request_id}. {error}', 'error')
+    else:
+        flash(f'Request #{request_id} marked as ISSUED. Inventory updated.', 'success')
+    return redirect(url_for('tech_dashboard'))
 
-    target_request = next((req for req in all_requests if req['id'] == request_id), None)
 
-    if target_request and target_request['status'] == 'Approved':
-        target_component = next((comp for comp in all_components if comp['name'] == target_request['component_name']),
-                                None)
+@app.route('/tech/dispatch_bulk', methods=['POST'])
+@role_required('technician')
+def tech_dispatch_bulk():
+    """Issues every selected request; the form carries request_id (repeated) and drawer_number_<id>."""
+    request_ids = request.form.getlist('request_id', type=int)
+    if not request_ids:
+        flash('Error: Select at least one request to issue.', 'error')
+        return redirect(url_for('tech_dashboard'))
 
-        if not target_component:
-            flash(f'Error: Component "{target_request["component_name"]}" not found in database. Cannot issue.',
-                  'error')
-            return redirect(url_for('tech_dashboard'))
+    results = issue_requests([(request_id, request.form.get(f'drawer_number_{request_id}', '').strip())
+                              for request_id in request_ids], session['user']['email'])
+    issued = [f'#{request_id}' for request_id, error in results if error is None]
+    if issued:
+        flash(f'{len(issued)} requests marked as ISSUED: {", ".join(issued)}. Inventory updated.', 'success')
+    for request_id, error in results:
+        if error:
+            flash(f'Error: Could not Issue request #{request_id}. {error}', 'error')
+    return redirect(url_for('tech_dashboard'))
 
-        # Re-calculate available stock from the source of truth
-        available_stock = target_component['working_quantity'] - target_component['issued_quantity']
-        if available_stock < target_request['quantity']:
-            flash(
-                f'Error: Insufficient stock for "{target_component["name"]}". Only {available_stock} available. Cannot issue.',
-                'error')
-            return redirect(url_for('tech_dashboard'))
 
-        old_issued = target_component['issued_quantity']
-        target_component['issued_quantity'] += target_request['quantity']
-        new_issued = target_component['issued_quantity']
+def _collection_error(target_request, working_count, not_working_count):
+    """Why these return counts cannot be accepted for the request, or None."""
+    if working_count < 0 or not_working_count < 0:
+        return 'Counts cannot be negative.'
+    total_returned = working_count + not_working_count
+    if total_returned != target_request['quantity']:
+        return f"Total items ({total_returned}) does not match issued ({target_request['quantity']})."
+    return None
 
-        target_request['status'] = 'ISSUED'
-        target_request['issue_timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
-        # --- NEW: Save Drawer Number ---
-        if target_request.get('project_type') == 'Project Work' and drawer_number:
-            target_request['drawer_number'] = drawer_number
-        # --- END NEW ---
+def _collect_request(catalog, target_request, working_count, not_working_count, tech_remarks):
+    """
+    Marks one ISSUED request Returned and moves its items back into stock.
+    Returns (component, stock_before, stock_after); component is None when
+    it is no longer in the catalog, and no stock is changed then.
+    """
+    stock_fields = ('issued_quantity', 'working_quantity', 'not_working_quantity')
+    target_component = catalog.find_by_name(target_request['component_name'])
+    stock_before = stock_after = None
+    if target_component:
+        stock_before = {field: target_component[field] for field in stock_fields}
 
-        save_components(all_components)
-        save_requests(all_requests)
+        # 1. Decrease issued quantity
+        target_component['issued_quantity'] -= working_count + not_working_count
 
-        app.logger.info(f'ITEM ISSUED: Tech "{tech_user_email}" ISSUED req #{request_id}')
-        # --- MODIFIED AUDIT ---
-        audit_logger.info(
-            f'ISSUE by {tech_user_email}: Req #{request_id}. Stock {target_component["name"]} issued {old_issued} -> {new_issued}. Drawer: {drawer_number or "N/A"}')
-        # --- END MODIFIED AUDIT ---
+        # 2. Add to not_working_quantity
+        target_component['not_working_quantity'] += not_working_count
 
-        flash(f'Request #{request_id} marked as ISSUED. Inventory updated.', 'success')
-    else:
-        flash('Error: Could not Issue request. Not found or not in "Approved" state.', 'error')
+        # 3. Recalculate working_quantity based on total
+        target_component['working_quantity'] = target_component['total_quantity'] - target_component[
+            'not_working_quantity']
 
-    return redirect(url_for('tech_dashboard'))
+        if target_component['issued_quantity'] < 0: target_component['issued_quantity'] = 0
+
+        catalog.refresh(target_component)
+        stock_after = {field: target_component[field] for field in stock_fields}
+
+    target_request['status'] = 'Returned'
+    target_request['actual_return_timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    target_request['working_count'] = working_count
+    target_request['not_working_count'] = not_working_count
+    target_request['tech_remarks'] = tech_remarks if tech_remarks else "N/A"
+    return target_component, stock_before, stock_after
 
 
 @app.route('/tech/collect_form/<int:request_id>', methods=['GET', 'POST'])
 @role_required('technician')
 def tech_collect_item_form(request_id):
     tech_user = session['user']
-    all_requests = load_requests()
-    all_components = load_components()
+    if request.method == 'GET':
+        target_request = get_request(request_id)
+        if not target_request:
+            abort(404)
+        if target_request['status'].lower() != 'issued':
+            flash('Error: This item is not in "ISSUED" state. Cannot collect.', 'error')
+            return redirect(url_for('tech_dashboard'))
+        return render_template('tech_collect_form.html',
+                               user=tech_user,
+                               request=target_request)
 
-    target_request = next((req for req in all_requests if req['id'] == request_id), None)
+    with store_transaction():
+        catalog = load_catalog()
 
-    if not target_request:
-        abort(404)
+        target_request = get_request(request_id)
 
-    if target_request['status'].lower() != 'issued':
-        flash('Error: This item is not in "ISSUED" state. Cannot collect.', 'error')
-        return redirect(url_for('tech_dashboard'))
+        if not target_request:
+            abort(404)
 
-    target_component = next((comp for comp in all_components if comp['name'] == target_request['component_name']), None)
+        if target_request['status'].lower() != 'issued':
+            flash('Error: This item is not in "ISSUED" state. Cannot collect.', 'error')
+            return redirect(url_for('tech_dashboard'))
 
-    if request.method == 'POST':
         try:
             working_count = int(request.form.get('working_count'))
             not_working_count = int(request.form.get('not_working_count'))
             tech_remarks = request.form.get('tech_remarks', '').strip()
-            total_returned = working_count + not_working_count
 
-            if total_returned != target_request['quantity']:
-                flash(f"Error: Total items ({total_returned}) does not match issued ({target_request['quantity']}).",
-                      'error')
+            error = _collection_error(target_request, working_count, not_working_count)
+            if error:
+                flash(f"Error: {error}", 'error')
                 return redirect(url_for('tech_collect_item_form', request_id=request_id))
 
+            target_component, stock_before, stock_after = _collect_request(
+                catalog, target_request, working_count, not_working_count, tech_remarks)
             if target_component:
-                # 1. Decrease issued quantity
-                target_component['issued_quantity'] -= total_returned
-
-                # 2. Add to not_working_quantity
-                target_component['not_working_quantity'] += not_working_count
-
-                # 3. Recalculate working_quantity based on total
-                target_component['working_quantity'] = target_component['total_quantity'] - target_component[
-                    'not_working_quantity']
-
-                if target_component['issued_quantity'] < 0: target_component['issued_quantity'] = 0
-
-                audit_logger.info(
-                    f'COLLECTION by {tech_user["email"]}: Req #{request_id}. {working_count} working, {not_working_count} not working.')
-                save_components(all_components)
-
+                audit_event('COLLECTION', tech_user['email'], request_id=request_id,
+                            component=target_component['name'], before=stock_before, after=stock_after,
+                            remarks=f"{working_count} working, {not_working_count} not working. {tech_remarks}".strip())
+                save_catalog(catalog)
             else:
-                audit_logger.warning(
-                    f'COLLECTION (No Stock Update): Tech {tech_user["email"]} collected Req #{request_id} but component "{target_request["component_name"]}" not in DB.')
-
-            target_request['status'] = 'Returned'
-            target_request['actual_return_timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-            target_request['working_count'] = working_count
-            target_request['not_working_count'] = not_working_count
-            target_request['tech_remarks'] = tech_remarks if tech_remarks else "N/A"
+                audit_event('COLLECTION (No Stock Update)', tech_user['email'], request_id=request_id,
+                            component=target_request['component_name'],
+                            remarks=f"{working_count} working, {not_working_count} not working. Component not in DB.",
+                            level=logging.WARNING)
 
-            save_requests(all_requests)
+            save_request_records([target_request])
             flash(f'Request #{request_id} marked as Returned. Inventory updated.', 'success')
             return redirect(url_for('tech_dashboard'))
 
@@ -1256,9 +3797,88 @@ def tech_collect_item_form(request_id):
             flash(f'An error occurred: {e}', 'error')
             return redirect(url_for('tech_collect_item_form', request_id=request_id))
 
-    return render_template('tech_collect_form.html',
-                           user=tech_user,
-                           request=target_request)
+
+def _collection_selection():
+    """The ISSUED requests named by ?batch_id= or repeated request_id fields, in id order."""
+    batch_id = request.values.get('batch_id')
+    if batch_id:
+        return find_requests(batch_id=batch_id, status='ISSUED')
+    request_ids = sorted(set(request.values.getlist('request_id', type=int)))
+    return [req for req in map(get_request, request_ids) if req and req['status'] == 'ISSUED']
+
+
+@app.route('/tech/collect_batch', methods=['GET', 'POST'])
+@role_required('technician')
+def tech_collect_batch():
+    """
+    Collects every ISSUED item in a batch (?batch_id=) or a selection
+    (repeated request_id). All counts are validated before anything is
+    saved; then the stock and requests are saved once and one grouped
+    BATCH COLLECTION audit event is written.
+    """
+    tech_user = session['user']
+    batch_id = request.values.get('batch_id')
+    selection_url = url_for('tech_collect_batch', batch_id=batch_id) if batch_id else \
+        url_for('tech_collect_batch', request_id=request.values.getlist('request_id', type=int))
+
+    if request.method == 'GET':
+        targets = _collection_selection()
+        if not targets:
+            flash('Error: None of the selected items are in "ISSUED" state. Nothing to collect.', 'error')
+            return redirect(url_for('tech_dashboard'))
+        return render_template('tech_collect_batch.html', user=tech_user, requests=targets,
+                               batch_id=batch_id, selection_url=selection_url)
+
+    with store_transaction():
+        targets = _collection_selection()
+        if not targets:
+            flash('Error: None of the selected items are in "ISSUED" state. Nothing to collect.', 'error')
+            return redirect(url_for('tech_dashboard'))
+
+        counts, errors = {}, []
+        for target_request in targets:
+            request_id = target_request['id']
+            try:
+                working_count = int(request.form.get(f'working_count_{request_id}'))
+                not_working_count = int(request.form.get(f'not_working_count_{request_id}'))
+            except (TypeError, ValueError):
+                errors.append(f'Request #{request_id}: Invalid count. Please enter numbers.')
+                continue
+            error = _collection_error(target_request, working_count, not_working_count)
+            if error:
+                errors.append(f'Request #{request_id}: {error}')
+            counts[request_id] = (working_count, not_working_count,
+                                  request.form.get(f'tech_remarks_{request_id}', '').strip())
+        if errors:
+            for error in errors:
+                flash(f'Error: {error}', 'error')
+            flash('Nothing was collected. Correct the counts and submit again.', 'error')
+            return redirect(selection_url)
+
+        catalog = load_catalog()
+        items, stock_changed = [], False
+        for target_request in targets:
+            working_count, not_working_count, tech_remarks = counts[target_request['id']]
+            target_component, stock_before, stock_after = _collect_request(
+                catalog, target_request, working_count, not_working_count, tech_remarks)
+            stock_changed = stock_changed or target_component is not None
+            remarks = [f"{working_count} working, {not_working_count} not working",
+                       tech_remarks if target_component else 'Component not in DB']
+            items.append({'request_id': target_request['id'], 'component': target_request['component_name'],
+                          'before': stock_before, 'after': stock_after, 'remarks': '. '.join(filter(None, remarks))})
+        if stock_changed:
+            save_catalog(catalog)
+        save_request_records(targets)
+
+    total_working = sum(counts[req_id][0] for req_id in counts)
+    total_not_working = sum(counts[req_id][1] for req_id in counts)
+    scope = f" for batch {batch_id}" if batch_id else ""
+    audit_event('BATCH COLLECTION', tech_user['email'], items=items,
+                remarks=f"{len(items)} items returned{scope}: {total_working} working, {total_not_working} not working")
+    app.logger.info(f'BATCH COLLECTION: Tech "{tech_user["email"]}" collected {len(items)} requests')
+    returned = ', '.join(f"#{item['request_id']}" for item in items)
+    flash(f'{len(items)} requests marked as Returned: {returned}. Inventory updated.', 'success')
+    return redirect(url_for('tech_dashboard'))
 
 
 @app.route('/tech/add_inventory', methods=['POST'])
@@ -1274,29 +3894,29 @@ def tech_add_inventory():
         flash('Error: "Working" count cannot be greater than "Total" count.', 'error')
         return redirect(url_for('tech_dashboard'))
 
-    all_components = load_components()
+    with store_transaction():
+        catalog = load_catalog()
 
-    for comp in all_components:
-        if comp['id'] == new_id:
+        if catalog.get(new_id):
             flash(f'Error: Component ID "{new_id}" already exists.', 'error')
             return redirect(url_for('tech_dashboard'))
-        if comp['name'].lower() == new_name.lower():
+        if catalog.find_by_name(new_name, ignore_case=True):
             flash(f'Error: Component Name "{new_name}" already exists.', 'error')
             return redirect(url_for('tech_dashboard'))
 
-    new_component = {
-        "id": new_id,
-        "name": new_name,
-        "total_quantity": new_total,
-        "working_quantity": new_working,
-        "not_working_quantity": new_total - new_working,
-        "issued_quantity": 0
-    }
-    all_components.append(new_component)
-    save_components(all_components)
-
-    audit_logger.info(
-        f'NEW COMPONENT by {tech_user["email"]}: "{new_name}". Total: {new_total}, Working: {new_working}')
+        new_component = {
+            "id": new_id,
+            "name": new_name,
+            "total_quantity": new_total,
+            "working_quantity": new_working,
+            "not_working_quantity": new_total - new_working,
+            "issued_quantity": 0
+        }
+        catalog.add(new_component)
+        save_catalog(catalog)
+
+    audit_event('NEW COMPONENT', tech_user['email'], component=new_name,
+                after={'total_quantity': new_total, 'working_quantity': new_working})
     flash(f'Success: Component "{new_name}" has been added.', 'success')
     return redirect(url_for('tech_dashboard'))
 
@@ -1309,37 +3929,351 @@ def tech_update_inventory():
     new_working = int(request.form.get('new_working'))
     tech_user = session['user']
 
-    all_components = load_components()
-    target_component = next((comp for comp in all_components if comp['name'] == component_name), None)
+    with store_transaction():
+        catalog = load_catalog()
+        target_component = catalog.find_by_name(component_name)
 
-    if target_component:
-        old_total = target_component['total_quantity']
-        old_working = target_component['working_quantity']
+        if target_component:
+            old_total = target_component['total_quantity']
+            old_working = target_component['working_quantity']
 
-        if new_working > new_total:
-            flash(f'Error: New working count ({new_working}) cannot be greater than new total ({new_total}).', 'error')
-            return redirect(url_for('tech_dashboard'))
+            if new_working > new_total:
+                flash(f'Error: New working count ({new_working}) cannot be greater than new total ({new_total}).', 'error')
+                return redirect(url_for('tech_dashboard'))
 
-        current_issued = target_component['issued_quantity']
+            current_issued = target_component['issued_quantity']
+            current_reserved = target_component.get('reserved_quantity', 0)
 
-        # This is the key check
-        if (new_working - current_issued) < 0:
-            flash(
-                f'Error: New working count ({new_working}) is less than current issued count ({current_issued}). Please collect items first.',
-                'error')
+            # This is the key check
+            if (new_working - current_issued) < 0:
+                flash(
+                    f'Error: New working count ({new_working}) is less than current issued count ({current_issued}). Please collect items first.',
+                    'error')
+                return redirect(url_for('tech_dashboard'))
+            if (new_working - current_issued - current_reserved) < 0:
+                flash(
+                    f'Error: New working count ({new_working}) cannot cover the {current_issued} issued and '
+                    f'{current_reserved} reserved for open requests. Please release the reservations first.',
+                    'error')
+                return redirect(url_for('tech_dashboard'))
+
+            target_component['total_quantity'] = new_total
+            target_component['working_quantity'] = new_working
+            target_component['not_working_quantity'] = new_total - new_working
+
+            audit_event('MANUAL UPDATE', tech_user['email'], component=component_name,
+                        before={'total_quantity': old_total, 'working_quantity': old_working},
+                        after={'total_quantity': new_total, 'working_quantity': new_working})
+            catalog.refresh(target_component)
+            save_catalog(catalog)
+            flash(f'Inventory for "{component_name}" updated.', 'success')
+        else:
+            flash('Error: Component not found.', 'error')
+    return redirect(url_for('tech_dashboard'))
+
+
+# --- Bulk Inventory Import ---
+# A stock-take file is validated against the catalog and shown as a diff;
+# the confirm form carries the validated rows back in a signed token and
+# they are checked again inside the transaction that applies them.
+INVENTORY_IMPORT_MAX_AGE = 3600
+
+
+def _read_inventory_import(upload):
+    """
+    Yields (line, row) from an uploaded CSV (read as it streams) or a JSON
+    list of objects. A malformed file raises ValueError.
+    """
+    import csv
+    import io
+    if upload.filename.lower().endswith('.json'):
+        rows = json.load(upload.stream)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('A JSON import must be a list of component objects.')
+        yield from enumerate(rows, 1)
+        return
+    reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+    try:
+        missing = {'id', 'total_quantity', 'working_quantity'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"The CSV is missing the column(s): {', '.join(sorted(missing))}.")
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as e:
+        raise ValueError(f"Line {reader.line_num}: {e}") from e
+
+
+def plan_inventory_import(catalog, rows):
+    """
+    Validates (line, row) pairs against the catalog in one pass. Returns
+    (changes, unchanged, errors): the adds and updates to make, the number of
+    rows that match the catalog already, and one message per bad row.
+    """
+    changes, errors, unchanged = [], [], 0
+    seen_ids, new_names = set(), set()
+    for line, row in rows:
+        component_id = str(row.get('id') or '').strip().upper()
+        name = str(row.get('name') or '').strip()
+        if not component_id:
+            errors.append(f"Row {line}: Component ID is missing.")
+            continue
+        if component_id in seen_ids:
+            errors.append(f'Row {line}: Component ID "{component_id}" appears more than once.')
+            continue
+        seen_ids.add(component_id)
+        try:
+            total = int(str(row.get('total_quantity')).strip())
+            working = int(str(row.get('working_quantity')).strip())
+        except ValueError:
+            errors.append(f'Row {line}: Counts for "{component_id}" must be whole numbers.')
+            continue
+        if total < 0 or working < 0:
+            errors.append(f'Row {line}: Counts for "{component_id}" cannot be negative.')
+            continue
+        if working > total:
+            errors.append(f'Row {line}: Working count ({working}) cannot be greater than total ({total}).')
+            continue
+
+        existing = catalog.get(component_id)
+        after = {'total_quantity': total, 'working_quantity': working}
+        if existing:
+            if name and name != existing['name']:
+                errors.append(f'Row {line}: "{component_id}" is named "{existing["name"]}" in the inventory, '
+                              f'not "{name}". Renames are not supported.')
+                continue
+            if working < existing['issued_quantity']:
+                errors.append(f'Row {line}: New working count ({working}) for "{existing["name"]}" is less than '
+                              f'its issued count ({existing["issued_quantity"]}). Please collect items first.')
+                continue
+            committed = existing['issued_quantity'] + existing.get('reserved_quantity', 0)
+            if working < committed:
+                errors.append(f'Row {line}: New working count ({working}) for "{existing["name"]}" cannot cover the '
+                              f'{existing["issued_quantity"]} issued and {existing.get("reserved_quantity", 0)} '
+                              f'reserved for open requests. Please release the reservations first.')
+                continue
+            before = {'total_quantity': existing['total_quantity'], 'working_quantity': existing['working_quantity']}
+            if before == after:
+                unchanged += 1
+                continue
+            changes.append({'action': 'update', 'id': component_id, 'name': existing['name'],
+                            'before': before, 'after': after})
+        else:
+            if not name:
+                errors.append(f'Row {line}: New component "{component_id}" needs a name.')
+                continue
+            if catalog.find_by_name(name, ignore_case=True) or name.casefold() in new_names:
+                errors.append(f'Row {line}: Component Name "{name}" already exists.')
+                continue
+            new_names.add(name.casefold())
+            changes.append({'action': 'add', 'id': component_id, 'name': name, 'before': None, 'after': after})
+    return changes, unchanged, errors
+
+
+@app.route('/tech/import_inventory', methods=['POST'])
+@role_required('technician')
+def tech_import_inventory():
+    """Validates an uploaded stock-take file and shows what applying it would change."""
+    upload = request.files.get('inventory_file')
+    if not upload or not upload.filename:
+        flash('Error: Choose a CSV or JSON file to import.', 'error')
+        return redirect(url_for('tech_dashboard'))
+    try:
+        changes, unchanged, errors = plan_inventory_import(load_catalog(), _read_inventory_import(upload))
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f'Error: Could not read "{upload.filename}": {e}', 'error')
+        return redirect(url_for('tech_dashboard'))
+
+    token = None
+    if changes and not errors:
+        token = s.dumps({'filename': upload.filename,
+                         'rows': [[change['id'], change['name'], change['after']['total_quantity'],
+                                   change['after']['working_quantity']] for change in changes]},
+                        salt='inventory-import')
+    return render_template('tech_import_preview.html', user=session['user'], filename=upload.filename,
+                           changes=changes, unchanged=unchanged, errors=errors, token=token)
+
+
+@app.route('/tech/import_inventory/apply', methods=['POST'])
+@role_required('technician')
+def tech_apply_inventory_import():
+    tech_user = session['user']
+    try:
+        plan = s.loads(request.form.get('token', ''), salt='inventory-import', max_age=INVENTORY_IMPORT_MAX_AGE)
+    except SignatureExpired:
+        flash('Error: This import preview has expired. Please upload the file again.', 'error')
+        return redirect(url_for('tech_dashboard'))
+    except BadSignature:
+        flash('Error: Invalid import confirmation.', 'error')
+        return redirect(url_for('tech_dashboard'))
+
+    rows = [(line, {'id': component_id, 'name': name, 'total_quantity': total, 'working_quantity': working})
+            for line, (component_id, name, total, working) in enumerate(plan['rows'], 1)]
+    with store_transaction():
+        catalog = load_catalog()
+        # The stock may have moved since the preview; nothing is applied unless every row still holds.
+        changes, _unchanged, errors = plan_inventory_import(catalog, rows)
+        if errors:
+            for error in errors:
+                flash(f'Error: {error}', 'error')
+            flash('The inventory changed since the preview; nothing was imported. Please upload the file again.',
+                  'error')
             return redirect(url_for('tech_dashboard'))
 
-        target_component['total_quantity'] = new_total
-        target_component['working_quantity'] = new_working
-        target_component['not_working_quantity'] = new_total - new_working
+        for change in changes:
+            total, working = change['after']['total_quantity'], change['after']['working_quantity']
+            if change['action'] == 'add':
+                catalog.add({"id": change['id'], "name": change['name'], "total_quantity": total,
+                             "working_quantity": working, "not_working_quantity": total - working,
+                             "issued_quantity": 0})
+            else:
+                component = catalog.get(change['id'])
+                component['total_quantity'] = total
+                component['working_quantity'] = working
+                component['not_working_quantity'] = total - working
+                catalog.refresh(component)
+        if changes:
+            save_catalog(catalog)
+
+    for change in changes:
+        audit_event('NEW COMPONENT' if change['action'] == 'add' else 'MANUAL UPDATE', tech_user['email'],
+                    component=change['name'], before=change['before'], after=change['after'],
+                    remarks=f"Imported from {plan['filename']}")
+    app.logger.info(f'INVENTORY IMPORT: Tech "{tech_user["email"]}" applied {len(changes)} changes '
+                    f'from {plan["filename"]}')
+    flash(f'Imported {plan["filename"]}: {sum(c["action"] == "add" for c in changes)} components added, '
+          f'{sum(c["action"] == "update" for c in changes)} updated.', 'success')
+    return redirect(url_for('tech_dashboard'))
+
+
+# --- JSON API ---
+# Read-only endpoints for views that poll. Each response carries an ETag built
+# from the data version (bumped by every store commit), the URL and the user,
+# so a client revalidating with If-None-Match gets an empty 304 until
+# something is saved.
+
+def api_role_required(roles=None):
+    """role_required for the API: answers 401/403 JSON instead of redirecting. None allows any signed-in user."""
+    if isinstance(roles, str):
+        roles = [roles]
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'user' not in session:
+                return jsonify(error='Not logged in.'), 401
+            if roles is not None and session['user']['role'] not in roles:
+                return jsonify(error='You do not have permission to access this resource.'), 403
+            return f(*args, **kwargs)
 
-        audit_logger.info(
-            f'MANUAL UPDATE by {tech_user["email"]}: "{component_name}". Total: {old_total}->{new_total}, Working: {old_working}->{new_working}')
-        save_components(all_components)
-        flash(f'Inventory for "{component_name}" updated.', 'success')
+        return decorated_function
+
+    return decorator
+
+
+def data_version():
+    return storage.load_sequence(DATA_VERSION_SEQUENCE) or 0
+
+
+def api_response(build):
+    """Answers 304 if the client's ETag is still current; otherwise calls build() and returns it as compact JSON."""
+    etag = hashlib.sha1(f"{data_version()}|{request.full_path}|{session['user']['email']}".encode()).hexdigest()[:20]
+    # Weak comparison: compress_response() weakens the ETag of responses it compresses.
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
     else:
-        flash('Error: Component not found.', 'error')
-    return redirect(url_for('tech_dashboard'))
+        response = Response(json.dumps(build(), separators=(',', ':')), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+@app.route('/api/v1/components')
+@api_role_required()
+def api_components():
+    return api_response(lambda: {'components': get_augmented_components()})
+
+
+@app.route('/api/v1/my-requests')
+@api_role_required()
+def api_my_requests():
+    return api_response(lambda: {'requests': find_requests(student_email=session['user']['email'])})
+
+
+@app.route('/api/v1/tech/queue')
+@api_role_required('technician')
+def api_tech_queue():
+    return api_response(lambda: {'approved': find_requests(status='Approved'),
+                                 'issued': find_requests(status='ISSUED')})
+
+
+@app.route('/api/v1/admin/pending')
+@api_role_required('admin')
+def api_admin_pending():
+    return api_response(lambda: {'pending': load_incharge_queue()})
+
+
+# --- Startup Profiling ---
+# Run in a fresh interpreter so the numbers are those of a cold worker.
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get(sys.argv[1]).status_code
+first = time.perf_counter()
+client.get(sys.argv[1])
+second = time.perf_counter()
+print(json.dumps({'import': imported - started, 'first': first - imported, 'second': second - first,
+                  'status': status}))
+"""
+
+
+def _parse_importtime(stderr):
+    """(self, cumulative, depth, module) per line of `python -X importtime` output, in microseconds."""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        module = name.lstrip()
+        yield int(self_us), int(cumulative_us), (len(name) - len(module) - 1) // 2, module
+
+
+@app.cli.command('startup-report')
+@click.option('--path', default='/', show_default=True, help='Page to time the first response of.')
+@click.option('--top', default=10, show_default=True, help='How many of the slowest imports to list.')
+def startup_report_command(path, top):
+    """Times a cold start: what importing the app costs, and its first and second response."""
+    import subprocess
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_PROBE, path],
+                            cwd=app.root_path, capture_output=True, text=True)
+    if result.returncode:
+        raise click.ClickException(f"The startup probe failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    imports = list(_parse_importtime(result.stderr))
+    app_line = next((i for i, entry in enumerate(imports) if entry[3] == 'app' and entry[2] == 0), None)
+    if app_line is not None:
+        # importtime lists a module after everything it imported, so app's own imports precede it.
+        start = app_line
+        while start > 0 and imports[start - 1][2] > 0:
+            start -= 1
+        direct = [entry for entry in imports[start:app_line] if entry[2] == 1]
+        click.echo(f"Importing app: {imports[app_line][1] / 1000:.1f} ms "
+                   f"({imports[app_line][0] / 1000:.1f} ms in app.py itself)")
+        for self_us, cumulative_us, _depth, module in sorted(direct, key=lambda entry: -entry[1])[:top]:
+            click.echo(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+    click.echo(f"Import wall time: {timings['import'] * 1000:.1f} ms")
+    click.echo(f"First response to GET {path} ({timings['status']}): {timings['first'] * 1000:.1f} ms")
+    click.echo(f"Second response: {timings['second'] * 1000:.1f} ms")
+    import importlib.util
+    bytecode = os.path.exists(importlib.util.cache_from_source(__file__))
+    cached = len(glob.glob(os.path.join(JINJA_CACHE_DIR, '*.cache')))
+    click.echo(f"app.py bytecode: {'cached' if bytecode else 'none, so every start compiles app.py'}")
+    click.echo(f"Compiled templates in {JINJA_CACHE_DIR}/: {cached}")
+    if not bytecode or not cached:
+        click.echo("Run `flask precompile` at deploy time to write both.")
 
 
 # --- Run App ---
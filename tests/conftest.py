@@ -0,0 +1,49 @@
+import datetime
+import importlib
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUDENT = 'ch.en.u4rai24056@ch.students.amrita.edu'
+INCHARGE = ('lab_incharge@ch.amrita.edu', 'adminpass')
+TECHNICIAN = ('lab_tecnician@ch.amrita.edu', 'techpass')
+
+
+@pytest.fixture
+def storage_backend():
+    """RACELAB_STORAGE for the app under test; override in a test module to use another backend."""
+    return 'json'
+
+
+@pytest.fixture
+def racelab(tmp_path, monkeypatch, storage_backend):
+    """A fresh import of app.py working on a copy of the shipped data files."""
+    monkeypatch.setenv('RACELAB_STORAGE', storage_backend)
+    for name in ('app.py', 'components.json', 'requests.json', 'users.json', 'audit.log', 'static', 'templates'):
+        source = os.path.join(REPO, name)
+        (shutil.copytree if os.path.isdir(source) else shutil.copy2)(source, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop('app', None)
+    module = importlib.import_module('app')
+    module.app.config['TESTING'] = True
+    yield module
+    sys.modules.pop('app', None)
+
+
+@pytest.fixture
+def client(racelab):
+    return racelab.app.test_client()
+
+
+def login(client, email, password=''):
+    client.get('/logout')
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302
+
+
+def today():
+    return datetime.date.today().strftime('%Y-%m-%d')
@@ -0,0 +1,30 @@
+from conftest import STUDENT, login
+
+CLOSED_IDS = [3, 4, 7, 10, 19]
+
+
+def _archive(racelab):
+    result = racelab.app.test_cli_runner().invoke(args=['archive-requests'])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_closed_requests_move_into_monthly_segments(racelab):
+    assert 'Archived 5 closed requests' in _archive(racelab)
+    segments = racelab.load_archive_manifest()['segments']
+    assert [(segment['month'], segment['ids']) for segment in segments] == [('2025-11', CLOSED_IDS)]
+    assert not set(CLOSED_IDS) & {req['id'] for req in racelab.load_requests()}
+    assert [req['id'] for req in racelab.iter_archived_requests(student_email=STUDENT)] == [3, 4, 7, 10]
+
+    assert 'Archived 0 closed requests' in _archive(racelab)
+    assert len(racelab.load_archive_manifest()['segments']) == 1
+
+
+def test_history_reads_the_archive_only_when_asked(racelab, client):
+    _archive(racelab)
+    racelab._read_archive_segment.cache_clear()
+    login(client, STUDENT)
+    assert client.get('/student_dashboard').status_code == 200
+    assert racelab._read_archive_segment.cache_info().misses == 0
+    assert client.get('/student_dashboard?archived=1').status_code == 200
+    assert racelab._read_archive_segment.cache_info().misses == 1
@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+
+from conftest import INCHARGE, login
+
+TECH = 'lab_tecnician@ch.amrita.edu'
+ADMIN = 'lab_incharge@ch.amrita.edu'
+
+# One line of every free-text message app.py wrote before audit events were JSON.
+LEGACY_LINES = [
+    (f'APPROVAL by {ADMIN}: Req #1. Stock Raspberry Pi 4 14 -> 13', 'APPROVAL', ADMIN, 1, 'Raspberry Pi 4'),
+    (f'APPROVAL by {ADMIN}: Req #7. Item Arduino Uno approved for issue.', 'APPROVAL', ADMIN, 7, 'Arduino Uno'),
+    (f'PURCHASE by {ADMIN}: Req #9 (LiDAR Sensor) marked as Purchased.', 'PURCHASE', ADMIN, 9, 'LiDAR Sensor'),
+    (f'ISSUE by {TECH}: Req #42. Stock Arduino Uno issued 1 -> 2. Drawer: 4', 'ISSUE', TECH, 42, 'Arduino Uno'),
+    (f'COLLECTION by {TECH}: Req #12. 2 working, 1 not working.', 'COLLECTION', TECH, 12, None),
+    (f'COLLECTION (No Stock Update): Tech {TECH} collected Req #13 but component "Servo" not in DB.',
+     'COLLECTION (No Stock Update)', TECH, 13, 'Servo'),
+    (f'NEW COMPONENT by {TECH}: "Servo". Total: 5, Working: 5', 'NEW COMPONENT', TECH, None, 'Servo'),
+    (f'MANUAL UPDATE by {TECH}: "Servo". Total: 5->6, Working: 5->6', 'MANUAL UPDATE', TECH, None, 'Servo'),
+    (f'CANCELLED by {TECH}: Req #54 (was Approved). Remarks: Not needed', 'CANCELLED', TECH, 54, None),
+]
+
+
+def test_legacy_audit_line_decodes(racelab):
+    event = racelab.decode_audit_line(
+        '2025-11-12 13:12:41,377 - ISSUE by lab_tecnician@ch.amrita.edu: Req #42. '
+        'Stock Arduino Uno issued 1 -> 2. Drawer: N/A\n')
+    assert event['ts'] == '2025-11-12 13:12:41,377'
+    assert event['action'] == 'ISSUE'
+    assert event['actor'] == 'lab_tecnician@ch.amrita.edu'
+    assert event['request_id'] == 42
+    assert event['component'] == 'Arduino Uno'
+
+
+@pytest.mark.parametrize('message, action, actor, request_id, component', LEGACY_LINES)
+def test_every_legacy_format_decodes(racelab, message, action, actor, request_id, component):
+    event = racelab.decode_audit_line(f'2025-11-12 13:12:41,377 - {message}\n')
+    assert (event['action'], event['actor'], event['request_id'], event['component']) == (
+        action, actor, request_id, component)
+
+
+def test_legacy_audit_lines_are_queryable(racelab, client):
+    login(client, *INCHARGE)
+    events = client.get('/admin/audit?request_id=54').get_json()['events']
+    assert [(event['action'], event['actor']) for event in events] == [
+        ('APPROVAL', 'lab_incharge@ch.amrita.edu'), ('CANCELLED', 'lab_tecnician@ch.amrita.edu')]
+    rows = client.get('/admin/download_audit_log').get_data(as_text=True)
+    assert ',UNKNOWN,' not in rows
+
+
+def test_audit_index_lists_empty_segments(racelab, monkeypatch):
+    for stamp, lines in (('2025-01-01_00-00-00', ['{"ts": "2025-01-01 09:00:00,000", "action": "ISSUE"}']),
+                         ('2025-02-01_00-00-00', []),
+                         ('2025-03-01_00-00-00', ['{"ts": "2025-03-01 09:00:00,000", "action": "COLLECTION"}'])):
+        with gzip.open(f'{racelab.AUDIT_LOG}.{stamp}.gz', 'wt') as f:
+            f.writelines(line + '\n' for line in lines)
+    with racelab._exclusive_lock(racelab.AUDIT_EXPORT_LOCK_FILE):
+        index = racelab.refresh_audit_index()
+        assert [path for path, _ts in index['segments']] == racelab.sealed_audit_segments()
+        assert [ts for _path, ts in index['segments']] == ['2025-01-01 09:00:00,000', None, '2025-03-01 09:00:00,000']
+        with monkeypatch.context() as patch:
+            # Nothing new: the segments must not be read again.
+            patch.setattr(racelab, '_read_audit_segment', None)
+            assert racelab.refresh_audit_index() == index
+
+    events = racelab.query_audit_events(since='2025-02-15', until='2025-03-31')
+    assert [event['action'] for event in events] == ['COLLECTION']
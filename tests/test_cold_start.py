@@ -0,0 +1,38 @@
+import glob
+import importlib.util
+import os
+import sys
+
+import pytest
+
+from conftest import REPO
+
+
+def test_precompile_writes_bytecode_templates_and_assets(racelab):
+    result = racelab.app.test_cli_runner().invoke(args=['precompile'])
+    assert result.exit_code == 0, result.output
+    assert os.path.exists(importlib.util.cache_from_source(racelab.__file__))
+    assert len(glob.glob(os.path.join(racelab.JINJA_CACHE_DIR, '*.cache'))) == len(
+        racelab.app.jinja_env.list_templates(extensions=['html']))
+    assert 'style.css' in racelab.static_assets and os.path.isdir(racelab.STATIC_BUILD_DIR)
+
+
+def test_shipped_artifacts_are_current(racelab):
+    """`flask precompile` must be re-run (and its output committed) whenever app.py or a template changes."""
+    source = os.path.join(REPO, 'app.py')
+    bytecode = importlib.util.cache_from_source(source)
+    if not bytecode.endswith(f'{sys.implementation.cache_tag}.pyc') or not os.path.exists(bytecode):
+        pytest.skip(f'No shipped bytecode for {sys.implementation.cache_tag}.')
+    with open(source, 'rb') as f:
+        source_hash = importlib.util.source_hash(f.read())
+    with open(bytecode, 'rb') as f:
+        header = f.read(16)
+    assert header[:4] == importlib.util.MAGIC_NUMBER
+    assert int.from_bytes(header[4:8], 'little') == 0b11  # Hash-based, checked against the source.
+    assert header[8:16] == source_hash
+
+    cache = racelab.TemplateBytecodeCache(os.path.join(REPO, racelab.JINJA_CACHE_DIR))
+    env = racelab.app.jinja_env
+    for name in env.list_templates(extensions=['html']):
+        template_source, filename, _uptodate = env.loader.get_source(env, name)
+        assert cache.get_bucket(env, name, filename, template_source).code is not None, name
@@ -0,0 +1,22 @@
+from conftest import TECHNICIAN, login
+
+
+def test_collect_form_reads_without_the_store_lock(racelab, client, monkeypatch):
+    login(client, *TECHNICIAN)
+
+    def locked():
+        raise AssertionError('GET must not take the store lock')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(racelab, 'store_transaction', locked)
+        assert client.get('/tech/collect_form/1').status_code == 200
+        assert client.get('/tech/collect_form/3').status_code == 302  # Already returned.
+        assert client.get('/tech/collect_form/999').status_code == 404
+
+
+def test_collect_form_returns_the_item(racelab, client):
+    login(client, *TECHNICIAN)
+    issued = racelab.load_catalog().get('ESP32')['issued_quantity']
+    client.post('/tech/collect_form/1', data={'working_count': '1', 'not_working_count': '0'})
+    assert racelab.get_request(1)['status'] == 'Returned'
+    assert racelab.load_catalog().get('ESP32')['issued_quantity'] == issued - 1
@@ -0,0 +1,30 @@
+import gzip
+
+from conftest import INCHARGE, STUDENT, login
+
+
+def test_dashboard_is_gzipped(client):
+    login(client, STUDENT)
+    plain = client.get('/student_dashboard')
+    compressed = client.get('/student_dashboard', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+
+
+def test_small_and_unsupported_responses_stay_identity(racelab, client, monkeypatch):
+    login(client, STUDENT)
+    monkeypatch.setattr(racelab, '_brotli', lambda: None)
+    assert 'Content-Encoding' not in client.get('/student_dashboard', headers={'Accept-Encoding': 'br'}).headers
+    monkeypatch.setattr(racelab, 'COMPRESS_MIN_SIZE', 10 ** 9)
+    assert 'Content-Encoding' not in client.get('/student_dashboard', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_streamed_export_is_gzipped(client):
+    login(client, *INCHARGE)
+    plain = client.get('/admin/download_audit_log')
+    compressed = client.get('/admin/download_audit_log', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.is_streamed and 'Content-Length' not in compressed.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
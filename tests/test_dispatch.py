@@ -0,0 +1,29 @@
+from conftest import INCHARGE, STUDENT, TECHNICIAN, login, today
+
+
+def _approved_project_work(racelab, client):
+    login(client, STUDENT)
+    client.post('/request_component', data={'project_type': 'Project Work', 'return_date': today(),
+                                            'project_description': 'pw', 'component[]': ['Arduino Uno'],
+                                            'quantity[]': ['1']})
+    req = racelab.find_requests(student_email=STUDENT, status='Pending Incharge')[-1]
+    login(client, *INCHARGE)
+    client.post('/admin/update_request', data={'batch_id': req['batch_id'], 'new_status': 'Approved'})
+    assert racelab.get_request(req['id'])['status'] == 'Approved'
+    return req
+
+
+def test_dispatch_without_drawer_is_accepted(racelab, client):
+    req = _approved_project_work(racelab, client)
+    login(client, *TECHNICIAN)
+    client.post('/tech/dispatch', data={'request_id': req['id'], 'drawer_number': ''})
+    issued = racelab.get_request(req['id'])
+    assert issued['status'] == 'ISSUED' and issued['drawer_number'] is None
+
+
+def test_bulk_dispatch_records_drawers(racelab, client):
+    req = _approved_project_work(racelab, client)
+    login(client, *TECHNICIAN)
+    client.post('/tech/dispatch_bulk', data={'request_id': [str(req['id'])], f"drawer_number_{req['id']}": 'D-9'})
+    issued = racelab.get_request(req['id'])
+    assert issued['status'] == 'ISSUED' and issued['drawer_number'] == 'D-9'
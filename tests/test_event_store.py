@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from conftest import STUDENT, login, today
+
+
+@pytest.fixture
+def storage_backend():
+    return 'events'
+
+
+@pytest.fixture
+def events(racelab):
+    result = racelab.app.test_cli_runner().invoke(args=['migrate-events'])
+    assert result.exit_code == 0, result.output
+    return racelab
+
+
+def _submit(client, name='Arduino Uno'):
+    login(client, STUDENT)
+    response = client.post('/request_component', data={
+        'project_type': 'Intra-Day', 'return_date': today(),
+        'component[]': [name], 'quantity[]': ['1']})
+    assert response.status_code == 302
+
+
+def _state(requests_, components):
+    return (sorted(requests_, key=lambda r: r['id']), sorted(components, key=lambda c: c['id']))
+
+
+def _live(racelab):
+    return _state(racelab.storage.load_requests(), racelab.storage.load_components())
+
+
+def _commits(racelab):
+    with open(racelab.EVENT_STORE) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_from_first_snapshot_matches_live_state(events, client):
+    for name in ('Arduino Uno', 'Raspberry Pi 4', 'Arduino Uno'):
+        _submit(client, name)
+    assert len(_commits(events)) == 3
+
+    first = events._snapshot_entries()[0]
+    index, components = events._read_snapshot(first)
+    for commit, _end in events._read_event_log(first[2]):
+        for event in commit['events']:
+            index = events.apply_domain_event(index, components, event)
+    assert _state(index.records(), components.values()) == _live(events)
+
+
+def test_state_at_a_past_time(events, client):
+    _submit(client)
+    before_second = _live(events)
+    _submit(client)
+    # Commit timestamps have one-second resolution; give the two commits distinct ones.
+    lines = [dict(commit, ts=f'2030-01-01 00:00:0{commit["seq"]}') for commit in _commits(events)]
+    with open(events.EVENT_STORE, 'w') as f:
+        f.writelines(json.dumps(commit, separators=(',', ':')) + '\n' for commit in lines)
+
+    index, components, seq = events.reconstruct_state('2030-01-01 00:00:01')
+    assert seq == 1 and _state(index.records(), components.values()) == before_second
+    index, components, seq = events.reconstruct_state('2030-01-01')
+    assert seq == 2 and _state(index.records(), components.values()) == _live(events)
+
+
+def test_cold_start_from_snapshot_and_tail(events, client, monkeypatch):
+    monkeypatch.setattr(events, 'SNAPSHOT_EVERY_COMMITS', 2)
+    for _ in range(3):
+        _submit(client)
+    seq, _ts, offset, _name = events._snapshot_entries()[-1]
+    assert seq == 2
+    assert [commit['seq'] for commit, _end in events._read_event_log(offset)] == [3]
+
+    assert _state(events.EventBackend().load_requests(), events.EventBackend().load_components()) == _live(events)
@@ -0,0 +1,30 @@
+from conftest import login, today
+
+FACULTY = 'faculty.one@ch.amrita.edu'
+
+
+def _sequence(racelab, name):
+    return racelab.storage.load_sequence(name)
+
+
+def test_rejected_faculty_request_allocates_nothing(racelab, client):
+    login(client, FACULTY)
+    batches, version = _sequence(racelab, 'batch_id'), _sequence(racelab, racelab.DATA_VERSION_SEQUENCE)
+    client.post('/faculty_request', data={'request_type': 'borrow', 'return_date': today(),
+                                          'project_description': 'f', 'component[]': ['No Such Part'],
+                                          'quantity[]': ['1']})
+    client.post('/faculty_request', data={'request_type': 'purchase', 'purchase_component_name': '',
+                                          'purchase_quantity': '1', 'purchase_project': 'p'})
+    assert _sequence(racelab, 'batch_id') == batches
+    assert _sequence(racelab, racelab.DATA_VERSION_SEQUENCE) == version
+
+
+def test_faculty_request_is_one_commit(racelab, client):
+    login(client, FACULTY)
+    version = _sequence(racelab, racelab.DATA_VERSION_SEQUENCE) or 0
+    client.post('/faculty_request', data={'request_type': 'borrow', 'return_date': today(),
+                                          'project_description': 'f', 'component[]': ['Arduino Uno'],
+                                          'quantity[]': ['1']})
+    assert _sequence(racelab, racelab.DATA_VERSION_SEQUENCE) == version + 1
+    mine = racelab.find_requests(student_email=FACULTY)
+    assert len(mine) == 1 and mine[0]['batch_id'].startswith('B-')
@@ -0,0 +1,69 @@
+import io
+import json
+import re
+
+from conftest import TECHNICIAN, login
+
+
+def _upload(client, filename, content):
+    return client.post('/tech/import_inventory', data={'inventory_file': (io.BytesIO(content.encode()), filename)},
+                       content_type='multipart/form-data', follow_redirects=True).get_data(as_text=True)
+
+
+def _token(page):
+    return re.search(r'name="token" value="([^"]+)"', page).group(1)
+
+
+def test_csv_preview_then_apply(racelab, client):
+    login(client, *TECHNICIAN)
+    page = _upload(client, 'stock.csv', 'id,total_quantity,working_quantity\nUNO,32,31\nRPI4,20,20\n')
+    assert 'Arduino Uno' in page
+    assert racelab.load_catalog().get('UNO')['total_quantity'] == 30
+
+    client.post('/tech/import_inventory/apply', data={'token': _token(page)})
+    uno = racelab.load_catalog().get('UNO')
+    assert (uno['total_quantity'], uno['working_quantity'], uno['not_working_quantity']) == (32, 31, 1)
+
+
+def test_json_import_adds_components(racelab, client):
+    login(client, *TECHNICIAN)
+    rows = [{'id': 'bme280', 'name': 'BME280 Sensor', 'total_quantity': 4, 'working_quantity': 4}]
+    client.post('/tech/import_inventory/apply', data={'token': _token(_upload(client, 'stock.json', json.dumps(rows)))})
+    added = racelab.load_catalog().get('BME280')
+    assert added['name'] == 'BME280 Sensor' and added['available'] == 4
+
+
+def test_invalid_rows_get_no_token(client):
+    login(client, *TECHNICIAN)
+    page = _upload(client, 'stock.csv', 'id,total_quantity,working_quantity\nUNO,3,4\nNEW,1,1\n')
+    assert 'cannot be greater than total' in page and 'needs a name' in page
+    assert 'name="token"' not in page
+
+
+def test_tampered_token_is_refused(racelab, client):
+    login(client, *TECHNICIAN)
+    forged = racelab.s.dumps({'filename': 'x.csv', 'rows': [['UNO', 'Arduino Uno', 99, 99]]}, salt='other')
+    page = client.post('/tech/import_inventory/apply', data={'token': forged},
+                       follow_redirects=True).get_data(as_text=True)
+    assert 'Invalid import confirmation' in page
+    assert racelab.load_catalog().get('UNO')['total_quantity'] == 30
+
+
+def test_stale_preview_applies_nothing(racelab, client):
+    login(client, *TECHNICIAN)
+    page = _upload(client, 'stock.csv', 'id,total_quantity,working_quantity\nUNO,32,32\nRPI4,21,2\n')
+    token = _token(page)
+    catalog = racelab.load_catalog()
+    catalog.get('RPI4')['issued_quantity'] = 3
+    racelab.save_catalog(catalog)
+    page = client.post('/tech/import_inventory/apply', data={'token': token},
+                       follow_redirects=True).get_data(as_text=True)
+    assert 'nothing was imported' in page
+    assert racelab.load_catalog().get('UNO')['total_quantity'] == 30
+
+
+def test_malformed_inventory_csv_is_reported(client):
+    login(client, *TECHNICIAN)
+    oversized = 'id,total_quantity,working_quantity\nUNO,"' + 'x' * 200000 + '",1\n'
+    page = _upload(client, 'stock.csv', oversized)
+    assert 'Could not read' in page and 'field larger than field limit' in page
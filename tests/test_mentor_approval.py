@@ -0,0 +1,34 @@
+import time
+
+from conftest import STUDENT, login, today
+
+
+def _pending_mentor_request(racelab, client):
+    login(client, STUDENT)
+    client.post('/request_component', data={
+        'project_type': 'Competition', 'return_date': today(), 'mentor_name': 'M',
+        'mentor_email': 'mentor@ch.amrita.edu', 'project_description': 'x',
+        'component[]': ['Arduino Uno'], 'quantity[]': ['1']})
+    return racelab.find_requests(student_email=STUDENT, status='Pending Mentor')[-1]
+
+
+def _audit_lines():
+    with open('audit.log') as f:
+        return f.readlines()
+
+
+def test_mentor_response_must_approve_or_reject(racelab, client):
+    req = _pending_mentor_request(racelab, client)
+    url = f"/approve/mentor/{req['mentor_approval_token']}"
+    logged = len(_audit_lines())
+    for form in ({}, {'new_status': 'Purchased'}):
+        assert client.post(url, data=form).status_code == 400
+    assert racelab.get_request(req['id'])['status'] == 'Pending Mentor'
+    assert len(_audit_lines()) == logged
+
+    assert client.post(url, data={'new_status': 'Approved'}).status_code == 200
+    assert racelab.get_request(req['id'])['status'] == 'Pending Incharge'
+    deadline = time.monotonic() + 2
+    while len(_audit_lines()) == logged and time.monotonic() < deadline:
+        time.sleep(0.01)  # The log listener thread writes the event.
+    assert racelab.decode_audit_line(_audit_lines()[-1])['action'] == 'MENTOR APPROVED'
@@ -0,0 +1,47 @@
+import datetime
+
+
+def _history(racelab, days=200):
+    start = datetime.date(2024, 1, 1)
+    return racelab.RequestIndex(
+        {'id': n + 1, 'request_timestamp': f"{start + datetime.timedelta(days=n)} 10:00", 'status': 'Returned',
+         'batch_id': f'B-{n}', 'student_email': 's@x', 'component_name': 'Arduino Uno'}
+        for n in range(days))
+
+
+def _count_visits(racelab, monkeypatch):
+    visited = []
+    matches = racelab.request_matches
+
+    def counting(record, filters):
+        visited.append(record)
+        return matches(record, filters)
+    monkeypatch.setattr(racelab, 'request_matches', counting)
+    return visited
+
+
+def test_page_past_old_date_to_skips_newer_rows(racelab, monkeypatch):
+    index = _history(racelab)
+    filters = {'date_to': '2024-01-20'}
+    first = index.page(None, 5, filters)
+    assert [r['id'] for r in first] == [20, 19, 18, 17, 16]
+
+    visited = _count_visits(racelab, monkeypatch)
+    second = index.page(racelab.request_sort_key(first[-1]), 5, filters)
+    assert [r['id'] for r in second] == [15, 14, 13, 12, 11]
+    assert len(visited) == 5
+
+
+def test_page_stops_at_date_from(racelab, monkeypatch):
+    index = _history(racelab)
+    visited = _count_visits(racelab, monkeypatch)
+    records = index.page(None, 50, {'date_from': '2024-07-15', 'q': 'no such text'})
+    assert records == [] and all(r['request_timestamp'] >= '2024-07-15' for r in visited)
+
+
+def test_page_walks_a_small_status_only(racelab, monkeypatch):
+    index = _history(racelab)
+    index.put({**index.get(3), 'status': 'ISSUED'})
+    visited = _count_visits(racelab, monkeypatch)
+    assert [r['id'] for r in index.page(None, 10, {'status': 'ISSUED'})] == [3]
+    assert len(visited) == 1
@@ -0,0 +1,33 @@
+import json
+import os
+
+
+def _change_remarks(racelab, request_id, remarks):
+    req = racelab.get_request(request_id)
+    req['admin_remarks'] = remarks
+    racelab.save_request_records([req])
+
+
+def test_a_change_appends_one_journal_line(racelab):
+    with open(racelab.REQUESTS_DB, 'rb') as f:
+        snapshot = f.read()
+    _change_remarks(racelab, 5, 'journaled')
+    with open(racelab.REQUESTS_DB, 'rb') as f:
+        assert f.read() == snapshot
+    with open(racelab.REQUESTS_JOURNAL) as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line['id'], line['admin_remarks']) for line in lines] == [(5, 'journaled')]
+    # Another process reading the same files sees the journaled change.
+    assert racelab.JsonBackend().get_request(5)['admin_remarks'] == 'journaled'
+
+
+def test_journal_is_compacted_into_the_snapshot(racelab, monkeypatch):
+    monkeypatch.setattr(racelab, 'REQUESTS_JOURNAL_COMPACT_BYTES', 1)
+    count = len(racelab.load_requests())
+    _change_remarks(racelab, 5, 'compacted')
+    assert os.path.getsize(racelab.REQUESTS_JOURNAL) == 0
+    with open(racelab.REQUESTS_DB) as f:
+        snapshot = json.load(f)
+    assert len(snapshot) == count
+    assert next(req for req in snapshot if req['id'] == 5)['admin_remarks'] == 'compacted'
+    assert racelab.get_request(5)['admin_remarks'] == 'compacted'
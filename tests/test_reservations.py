@@ -0,0 +1,65 @@
+import io
+import json
+
+from conftest import STUDENT, TECHNICIAN, login, today
+
+
+def _reserve_all_available(racelab, client, name):
+    """Has the student reserve every available unit of `name`; returns the component afterwards."""
+    available = racelab.load_catalog().find_by_name(name)['available']
+    login(client, STUDENT)
+    response = client.post('/request_component', data={
+        'project_type': 'Intra-Day', 'return_date': today(),
+        'component[]': [name], 'quantity[]': [str(available)]})
+    assert response.status_code == 302
+    comp = racelab.load_catalog().find_by_name(name)
+    assert comp['reserved_quantity'] >= available and comp['available'] == 0
+    return comp
+
+
+def test_update_inventory_keeps_reserved_stock(racelab, client):
+    comp = _reserve_all_available(racelab, client, 'Arduino Uno')
+    login(client, *TECHNICIAN)
+    short = comp['issued_quantity'] + comp['reserved_quantity'] - 1
+    page = client.post('/tech/update_inventory', data={
+        'component_name': 'Arduino Uno', 'new_total': comp['total_quantity'], 'new_working': short},
+        follow_redirects=True).get_data(as_text=True)
+    assert 'release the reservations first' in page
+    assert racelab.load_catalog().find_by_name('Arduino Uno')['working_quantity'] == comp['working_quantity']
+
+    enough = comp['issued_quantity'] + comp['reserved_quantity']
+    client.post('/tech/update_inventory', data={
+        'component_name': 'Arduino Uno', 'new_total': comp['total_quantity'], 'new_working': enough})
+    assert racelab.load_catalog().find_by_name('Arduino Uno')['working_quantity'] == enough
+
+
+def test_inventory_import_keeps_reserved_stock(racelab, client):
+    comp = _reserve_all_available(racelab, client, 'Arduino Uno')
+    short = comp['issued_quantity'] + comp['reserved_quantity'] - 1
+    rows = [{'id': comp['id'], 'total_quantity': comp['total_quantity'], 'working_quantity': short}]
+    changes, _unchanged, errors = racelab.plan_inventory_import(racelab.load_catalog(), enumerate(rows, 1))
+    assert not changes and 'release the reservations first' in errors[0]
+
+    login(client, *TECHNICIAN)
+    upload = (io.BytesIO(json.dumps(rows).encode()), 'stock.json')
+    page = client.post('/tech/import_inventory', data={'inventory_file': upload},
+                       content_type='multipart/form-data').get_data(as_text=True)
+    assert 'release the reservations first' in page
+
+
+def test_expired_mentor_link_releases_reservation(racelab, client, monkeypatch):
+    before = racelab.load_catalog().find_by_name('Arduino Uno')['reserved_quantity']
+    login(client, STUDENT)
+    client.post('/request_component', data={
+        'project_type': 'Competition', 'return_date': today(), 'mentor_name': 'M',
+        'mentor_email': 'mentor@ch.amrita.edu', 'project_description': 'x',
+        'component[]': ['Arduino Uno'], 'quantity[]': ['2']})
+    req = racelab.find_requests(student_email=STUDENT, status='Pending Mentor')[-1]
+    assert racelab.load_catalog().find_by_name('Arduino Uno')['reserved_quantity'] == before + 2
+
+    monkeypatch.setattr(racelab, 'MENTOR_LINK_MAX_AGE', -1)
+    response = client.get(f"/approve/mentor/{req['mentor_approval_token']}")
+    assert response.status_code == 400
+    expired = racelab.get_request(req['id'])
+    assert expired['status'] == 'Rejected' and not expired['stock_reserved']
+    assert racelab.load_catalog().find_by_name('Arduino Uno')['reserved_quantity'] == before
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from conftest import STUDENT, login, today
+
+
+@pytest.fixture
+def storage_backend():
+    return 'sqlite'
+
+
+def _migrate(racelab):
+    result = racelab.app.test_cli_runner().invoke(args=['migrate-json'])
+    assert result.exit_code == 0, result.output
+
+
+def test_lookups_match_the_json_files(racelab):
+    _migrate(racelab)
+    source = racelab.JsonBackend()
+    assert racelab.storage.load_requests() == source.load_requests()
+    assert racelab.storage.find_requests(status='Approved') == source.find_requests(status='Approved')
+    assert racelab.storage.get_request(5) == source.get_request(5) is not None
+    assert racelab.storage.max_request_id() == source.max_request_id()
+
+
+def test_counters_continue_after_migration(racelab, client):
+    last_id = racelab.JsonBackend().max_request_id()
+    with open(racelab.SEQUENCES_DB, 'w') as f:
+        json.dump({'batch_id': 41, 'request_id': last_id + 5, racelab.DATA_VERSION_SEQUENCE: 7}, f)
+    _migrate(racelab)
+
+    login(client, STUDENT)
+    client.post('/request_component', data={
+        'project_type': 'Intra-Day', 'return_date': today(),
+        'component[]': ['Arduino Uno'], 'quantity[]': ['1']})
+    req = racelab.find_requests(student_email=STUDENT)[-1]
+    assert req['id'] == last_id + 6 and req['batch_id'].endswith('-0042')
+    assert racelab.storage.load_sequence(racelab.DATA_VERSION_SEQUENCE) == 8
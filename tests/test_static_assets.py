@@ -0,0 +1,28 @@
+import os
+
+
+def test_static_assets_build_on_first_use(racelab, client):
+    assert racelab.static_assets == {} and not os.path.exists(racelab.STATIC_BUILD_DIR)
+    page = client.get('/').get_data(as_text=True)
+    assert 'style.css' in racelab.static_assets
+    assert f"/assets/{racelab.static_assets['style.css']['digest']}/style.css" in page
+    response = client.get(f"/assets/{racelab.static_assets['style.css']['digest']}/style.css",
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_unwritable_build_dir_serves_uncompressed(racelab, client):
+    # A file where the build directory should be makes every write fail, as on a read-only disk.
+    open('blocked', 'w').close()
+    racelab.STATIC_BUILD_DIR = 'blocked'
+    assert client.get('/').status_code == 200
+    asset = racelab.static_assets['style.css']
+    assert asset['encodings'] == {}
+    response = client.get(f"/assets/{asset['digest']}/style.css", headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and 'Content-Encoding' not in response.headers
+
+
+def test_asset_paths_stay_inside_static(racelab, client):
+    assert racelab._static_asset('../app.py') is None
+    with racelab.app.test_request_context('/'):
+        assert racelab.static_url('missing.css') == '/static/missing.css'
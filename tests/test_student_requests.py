@@ -0,0 +1,25 @@
+from conftest import STUDENT, login, today
+
+
+def _competition(client, quantity='1'):
+    return client.post('/request_component', data={
+        'project_type': 'Competition', 'return_date': today(), 'mentor_name': 'M',
+        'mentor_email': 'mentor@ch.amrita.edu', 'project_description': 'x',
+        'component[]': ['Arduino Uno'], 'quantity[]': [quantity]})
+
+
+def test_student_request_is_one_commit(racelab, client):
+    login(client, STUDENT)
+    version = racelab.storage.load_sequence(racelab.DATA_VERSION_SEQUENCE) or 0
+    _competition(client)
+    assert racelab.storage.load_sequence(racelab.DATA_VERSION_SEQUENCE) == version + 1
+    req = racelab.find_requests(student_email=STUDENT, status='Pending Mentor')[-1]
+    assert racelab.s.loads(req['mentor_approval_token']) == req['batch_id']
+
+
+def test_failed_reservation_allocates_no_batch(racelab, client, monkeypatch):
+    login(client, STUDENT)
+    batches = racelab.storage.load_sequence('batch_id')
+    monkeypatch.setattr(racelab.ComponentCatalog, 'reserve', lambda self, req, force=False: False)
+    assert _competition(client).status_code == 302
+    assert racelab.storage.load_sequence('batch_id') == batches
@@ -0,0 +1,48 @@
+import json
+import os
+import time
+
+from conftest import STUDENT, TECHNICIAN, login, today
+
+
+def _submit(client, name):
+    client.post('/request_component', data={
+        'project_type': 'Intra-Day', 'return_date': today(), 'component[]': [name], 'quantity[]': ['1']})
+
+
+def test_commit_is_published_to_subscribers(racelab, client):
+    login(client, STUDENT)
+    # The first save gives every shipped component its reserved_quantity field.
+    _submit(client, 'Raspberry Pi 4')
+    subscription = racelab.event_bus.subscribe()
+    _submit(client, 'Arduino Uno')
+    event = subscription.get(timeout=1)
+    req = racelab.find_requests(student_email=STUDENT)[-1]
+    assert [record['id'] for record in event['requests']] == [req['id']]
+    assert [comp['id'] for comp in event['components']] == ['UNO']
+
+    with racelab.app.test_request_context('/'):
+        messages = list(racelab._tech_stream_messages(event))
+    assert [message.split('\n')[1] for message in messages] == ['event: request', 'event: stock']
+    stock = json.loads(messages[1].split('data: ', 1)[1])
+    assert stock['id'] == 'UNO' and 'Arduino Uno' in stock['html']
+
+
+def test_other_workers_events_are_tailed(racelab, monkeypatch):
+    monkeypatch.setattr(racelab, 'EVENTS_POLL_SECONDS', 0.01)
+    subscription = racelab.event_bus.subscribe()
+    time.sleep(0.1)  # Let the tailer find there is no log yet, so it reads the new one from the start.
+    event = {'version': 99, 'pid': os.getpid() + 1, 'requests': [], 'components': [], 'resync': True}
+    with open(racelab.EVENTS_LOG, 'a') as f:
+        f.write(json.dumps(event) + '\n')
+    assert subscription.get(timeout=2) == event
+
+
+def test_stream_requires_a_technician(racelab, client):
+    login(client, STUDENT)
+    assert client.get('/tech/stream').status_code == 302
+    login(client, *TECHNICIAN)
+    response = client.get('/tech/stream')
+    assert response.mimetype == 'text/event-stream'
+    assert next(response.response) == b'retry: 3000\n\n'
+    response.close()